@@ -0,0 +1,78 @@
+"""
+Filesystem helpers shared by the agent's on-disk caches and output writers.
+"""
+
+import os
+import threading
+
+
+def default_cache_root() -> str:
+    """Root directory of the agent's on-disk caches.
+
+    ``$XDG_CACHE_HOME/test-automation-agent`` when XDG_CACHE_HOME is set to
+    an absolute path, else ``~/.cache/test-automation-agent``. Pointing
+    XDG_CACHE_HOME at a tmpfs (e.g. ``/dev/shm/cache``) keeps the checkouts,
+    scan and LLM caches in memory.
+    """
+    base = os.environ.get("XDG_CACHE_HOME", "")
+    if not os.path.isabs(base):
+        base = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "test-automation-agent")
+
+
+class AtomicFile:
+    """Writable file that only appears at ``path`` once committed.
+
+    Data goes to a sibling temp file which ``commit`` moves into place with
+    ``os.replace`` (atomic on POSIX and Windows), so readers never observe a
+    partial file. Used as a context manager it commits on success and
+    discards the temp file if the block raises.
+    """
+
+    def __init__(self, path: str, mode: str = "w", encoding: str = None):
+        if "b" not in mode and encoding is None:
+            encoding = "utf-8"
+        self.path = path
+        self._tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self._file = open(self._tmp_path, mode, encoding=encoding)
+
+    def write(self, data):
+        return self._file.write(data)
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def truncate(self, *args):
+        return self._file.truncate(*args)
+
+    def commit(self) -> None:
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def discard(self) -> None:
+        self._file.close()
+        try:
+            os.unlink(self._tmp_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+        return False
+
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    """Write ``data`` to ``path`` so readers never observe a partial file."""
+    with AtomicFile(path, "wb") as f:
+        f.write(data)
+
+
+def atomic_write_text(path: str, text: str, encoding: str = "utf-8") -> None:
+    """Text counterpart of :func:`atomic_write_bytes`."""
+    atomic_write_bytes(path, text.encode(encoding))
@@ -1,15 +1,68 @@
 import hashlib
+import json
 import os
-import re
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import Optional
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
-_GIT_URL_RE = re.compile(r"^(https?://|git@|ssh://|git://)")
+from agent.fsutil import atomic_write_text
+
+
+_GIT_URL_PREFIXES = ("https://", "http://", "git@", "ssh://", "git://")
+
+FETCH_TTL_SECONDS = float(os.environ.get("TESTAGENT_FETCH_TTL", "60"))
+_FETCH_STAMP = "agent-last-fetch"
+HEAD_TTL_SECONDS = float(os.environ.get("TESTAGENT_HEAD_TTL", "60"))
+# Upper bound on concurrent git processes for the *_many helpers.
+_MAX_GIT_WORKERS = 8
+
+# Variables git (and the ssh/curl/credential helpers it spawns) actually
+# reads. Names starting with _GIT_ENV_PREFIXES (GIT_ASKPASS, GIT_SSL_CAINFO,
+# GIT_SSH_COMMAND, Git Credential Manager's GCM_*, ...) are passed through too.
+_GIT_ENV_KEYS = {
+    "PATH", "HOME", "USER", "LOGNAME", "LANG", "LC_ALL", "TMPDIR",
+    # Global config, and the credential-cache daemon's socket
+    "XDG_CONFIG_HOME", "XDG_CACHE_HOME",
+    "SSH_AUTH_SOCK", "SSH_ASKPASS", "DISPLAY",
+    "HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "NO_PROXY",
+    "http_proxy", "https_proxy", "all_proxy", "no_proxy",
+    # TLS trust stores and Kerberos credentials for HTTPS remotes
+    "SSL_CERT_FILE", "SSL_CERT_DIR", "CURL_CA_BUNDLE", "KRB5CCNAME", "KRB5_CONFIG",
+    # Windows; git finds ~/.gitconfig via HOMEDRIVE + HOMEPATH when HOME is unset
+    "SYSTEMROOT", "USERPROFILE", "HOMEDRIVE", "HOMEPATH", "APPDATA", "LOCALAPPDATA",
+    "TEMP", "TMP", "COMSPEC", "PATHEXT",
+}
+_GIT_ENV_PREFIXES = ("GIT_", "GCM_")
+
+
+def _build_git_env() -> dict:
+    return {
+        key: value
+        for key, value in os.environ.items()
+        if key in _GIT_ENV_KEYS or key.startswith(_GIT_ENV_PREFIXES)
+    }
+
+
+_GIT_ENV = _build_git_env()
+
+# Git never relies on inherited descriptors, so skip the close-all-fds pass
+# on POSIX; on Windows keep every git spawn from allocating a console.
+if os.name == "nt":
+    _POPEN_KWARGS = {"creationflags": subprocess.CREATE_NO_WINDOW}
+else:
+    _POPEN_KWARGS = {"close_fds": False}
 
 
 def is_git_url(value: str) -> bool:
-    return bool(value and _GIT_URL_RE.match(value.strip()))
+    return bool(value) and value.lstrip().startswith(_GIT_URL_PREFIXES)
 
 
 def _run_git(args: list, cwd: Optional[str] = None) -> str:
@@ -20,51 +73,370 @@ def _run_git(args: list, cwd: Optional[str] = None) -> str:
         stderr=subprocess.PIPE,
         text=True,
         check=False,
+        env=_GIT_ENV,
+        **_POPEN_KWARGS,
     )
     if result.returncode != 0:
         raise RuntimeError((result.stderr or result.stdout or "git command failed").strip())
     return (result.stdout or "").strip()
 
 
-def cache_dir_for_url(cache_root: str, repo_url: str) -> str:
+class GitBatchClient:
+    """Long-lived ``git cat-file --batch-check`` process for one repository.
+
+    Resolving a ref through the batch process is a pipe round trip instead of
+    a fresh ``git`` spawn. Queries are serialized with a lock so a client can
+    be shared between threads.
+    """
+
+    def __init__(self, repo_dir: str):
+        self.repo_dir = repo_dir
+        self._lock = threading.Lock()
+        self._proc = subprocess.Popen(
+            ["git", "-C", repo_dir, "cat-file", "--batch-check=%(objectname)"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+            env=_GIT_ENV,
+            **_POPEN_KWARGS,
+        )
+
+    def resolve(self, rev: str) -> str:
+        """Return the object name for ``rev``, or "" if it does not resolve."""
+        with self._lock:
+            if self._proc.poll() is not None:
+                raise RuntimeError(f"git cat-file exited unexpectedly in {self.repo_dir}")
+            self._proc.stdin.write(rev + "\n")
+            self._proc.stdin.flush()
+            line = self._proc.stdout.readline().strip()
+        if not line or line.endswith(" missing") or line.endswith(" ambiguous"):
+            return ""
+        return line
+
+    def close(self) -> None:
+        with self._lock:
+            if self._proc.poll() is None:
+                self._proc.stdin.close()
+                self._proc.wait()
+
+
+_batch_clients = {}
+_batch_clients_lock = threading.Lock()
+
+
+def get_batch_client(repo_dir: str) -> GitBatchClient:
+    """Return the shared batch client for ``repo_dir``, starting it if needed."""
+    key = os.path.abspath(repo_dir)
+    with _batch_clients_lock:
+        client = _batch_clients.get(key)
+        if client is None or client._proc.poll() is not None:
+            client = GitBatchClient(key)
+            _batch_clients[key] = client
+        return client
+
+
+def close_batch_client(repo_dir: str) -> None:
+    """Stop the batch client for ``repo_dir`` so the next query sees fresh refs."""
+    with _batch_clients_lock:
+        client = _batch_clients.pop(os.path.abspath(repo_dir), None)
+    if client is not None:
+        client.close()
+
+
+def get_local_head_sha(repo_dir: str) -> str:
+    """Return the SHA that HEAD points to in a local repository."""
+    return get_batch_client(repo_dir).resolve("HEAD")
+
+
+def _url_key(repo_url: str) -> str:
     url = repo_url.strip()
-    h = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
-    return os.path.join(cache_root, f"repo_{h}")
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def cache_dir_for_url(cache_root: str, repo_url: str) -> str:
+    """Return the working checkout directory for a repo URL."""
+    return os.path.join(cache_root, "checkouts", f"repo_{_url_key(repo_url)}")
+
 
+def mirror_dir_for_url(cache_root: str, repo_url: str) -> str:
+    """Return the bare mirror directory for a repo URL."""
+    return os.path.join(cache_root, "mirrors", f"repo_{_url_key(repo_url)}.git")
 
-def clone_or_update_repo(repo_url: str, cache_root: str) -> str:
-    """Ensure a local clone exists for the given repo URL.
 
-    Returns the local path to the repo.
+def _fetched_within(mirror_dir: str, ttl: float) -> bool:
+    try:
+        age = time.time() - os.path.getmtime(os.path.join(mirror_dir, _FETCH_STAMP))
+    except OSError:
+        return False
+    return age < ttl
+
+
+def _touch_fetch_stamp(mirror_dir: str) -> None:
+    with open(os.path.join(mirror_dir, _FETCH_STAMP), "w"):
+        pass
+
+
+@contextmanager
+def _mirror_lock(mirror_dir: str):
+    """Hold an exclusive ``flock`` on ``<mirror_dir>.lock``.
+
+    Serializes mirror and checkout updates between concurrent generate,
+    scan and watch processes sharing a cache. Where ``fcntl`` is
+    unavailable (Windows) the lock is a no-op.
     """
-    if not is_git_url(repo_url):
-        raise ValueError(f"Expected a git repo URL, got: {repo_url}")
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(mirror_dir), exist_ok=True)
+    with open(f"{mirror_dir}.lock", "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
 
-    os.makedirs(cache_root, exist_ok=True)
-    repo_dir = cache_dir_for_url(cache_root, repo_url)
 
-    if not os.path.isdir(os.path.join(repo_dir, ".git")):
-        if os.path.exists(repo_dir):
+def _update_mirror(repo_url: str, cache_root: str, mirror_dir: str, fetch_ttl: float) -> None:
+    if not os.path.isfile(os.path.join(mirror_dir, "HEAD")):
+        if os.path.exists(mirror_dir):
             raise RuntimeError(
-                f"Cache path exists but is not a git repository: {repo_dir}. "
+                f"Mirror path exists but is not a git repository: {mirror_dir}. "
                 "Please remove it manually."
             )
-        _run_git(["clone", "--depth", "1", repo_url, repo_dir])
-    else:
-        try:
-            _run_git(["remote", "set-url", "origin", repo_url], cwd=repo_dir)
-        except RuntimeError:
-            pass
-        _run_git(["fetch", "--prune", "origin"], cwd=repo_dir)
+        os.makedirs(os.path.dirname(mirror_dir), exist_ok=True)
+        _run_git(["clone", "--mirror", repo_url, mirror_dir])
+        _touch_fetch_stamp(mirror_dir)
+        return
+
+    # fetch_ttl <= 0 forces the fetch: the cached remote HEAD may predate a
+    # push the caller already saw, and it only covers the default branch.
+    if fetch_ttl > 0:
+        if _fetched_within(mirror_dir, fetch_ttl):
+            return
+        remote_sha = get_remote_head_sha(repo_url, cache_root=cache_root)
+        if remote_sha and remote_sha == get_local_head_sha(mirror_dir):
+            _touch_fetch_stamp(mirror_dir)
+            return
+
+    try:
+        _run_git(["remote", "set-url", "origin", repo_url], cwd=mirror_dir)
+    except RuntimeError:
+        pass
+    _run_git(["fetch", "--prune", "origin"], cwd=mirror_dir)
+    close_batch_client(mirror_dir)
+    _touch_fetch_stamp(mirror_dir)
+
+
+def _update_checkout(mirror_dir: str, checkout_dir: str) -> None:
+    if not os.path.isdir(os.path.join(checkout_dir, ".git")):
+        if os.path.exists(checkout_dir):
+            raise RuntimeError(
+                f"Cache path exists but is not a git repository: {checkout_dir}. "
+                "Please remove it manually."
+            )
+        os.makedirs(os.path.dirname(checkout_dir), exist_ok=True)
+        # --shared borrows objects from the mirror via alternates, so the
+        # checkout only costs the working tree files.
+        _run_git(["clone", "--shared", mirror_dir, checkout_dir])
+        return
 
-    return repo_dir
+    if get_local_head_sha(checkout_dir) == get_local_head_sha(mirror_dir):
+        return
 
+    _run_git(["fetch", "--prune", "origin"], cwd=checkout_dir)
+    _run_git(["reset", "--hard", "@{upstream}"], cwd=checkout_dir)
+    close_batch_client(checkout_dir)
 
-def get_remote_head_sha(repo_url: str) -> str:
-    """Return the SHA for the remote HEAD."""
-    out = _run_git(["ls-remote", repo_url, "HEAD"])
-    return out.split()[0] if out else ""
+
+def _checkout_is_current(
+    repo_url: str, cache_root: str, mirror_dir: str, checkout_dir: str, fetch_ttl: float
+) -> bool:
+    """True if the checkout already matches the remote, judged without a fetch.
+
+    A fresh fetch stamp speaks for the remote; otherwise the (head-cached)
+    ``ls-remote`` SHA must equal the checkout's HEAD. Runs without the
+    mirror lock since it only reads.
+    """
+    if not os.path.isdir(os.path.join(checkout_dir, ".git")):
+        return False
+    local_sha = get_local_head_sha(checkout_dir)
+    if not local_sha or local_sha != get_local_head_sha(mirror_dir):
+        return False
+    if _fetched_within(mirror_dir, fetch_ttl):
+        return True
+    return get_remote_head_sha(repo_url, cache_root=cache_root) == local_sha
+
+
+def clone_or_update_repo(
+    repo_url: str,
+    cache_root: str,
+    fetch_ttl: Optional[float] = None,
+) -> str:
+    """Ensure an up-to-date local checkout exists for the given repo URL.
+
+    The remote is cloned once into a bare mirror under ``<cache_root>/mirrors``
+    and refreshed with ``git fetch``; the working copy under
+    ``<cache_root>/checkouts`` is a ``--shared`` clone of that mirror. Mirror
+    fetches are skipped if the last one happened less than ``fetch_ttl``
+    seconds ago (default ``TESTAGENT_FETCH_TTL`` or 60), or when the cached
+    remote HEAD (see get_remote_head_sha) already matches the mirror's HEAD.
+    ``fetch_ttl=0`` always fetches, bypassing both checks. Updates hold a
+    file lock next to the mirror so concurrent processes sharing
+    ``cache_root`` don't race.
+
+    Returns the local path to the checkout.
+    """
+    if not is_git_url(repo_url):
+        raise ValueError(f"Expected a git repo URL, got: {repo_url}")
+
+    if fetch_ttl is None:
+        fetch_ttl = FETCH_TTL_SECONDS
+
+    mirror_dir = mirror_dir_for_url(cache_root, repo_url)
+    checkout_dir = cache_dir_for_url(cache_root, repo_url)
+
+    # Common case: nothing moved upstream, so skip the lock and the fetch.
+    if fetch_ttl > 0 and _checkout_is_current(
+        repo_url, cache_root, mirror_dir, checkout_dir, fetch_ttl
+    ):
+        return checkout_dir
+
+    with _mirror_lock(mirror_dir):
+        _update_mirror(repo_url, cache_root, mirror_dir, fetch_ttl)
+        _update_checkout(mirror_dir, checkout_dir)
+
+    return checkout_dir
+
+
+def _head_cache_path(cache_root: str) -> str:
+    return os.path.join(cache_root, "heads.json")
+
+
+_head_cache_lock = threading.Lock()
+
+
+def _load_head_cache(path: str) -> dict:
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _ls_remote_head(repo_url: str, ref: str = "HEAD") -> str:
+    if ref == "HEAD":
+        out = _run_git(["ls-remote", repo_url, "HEAD"])
+        return out.split()[0] if out else ""
+
+    # Only ask for the one branch so the remote doesn't advertise every ref
+    out = _run_git(["ls-remote", "--heads", repo_url, ref])
+    for line in out.splitlines():
+        sha, _, name = line.partition("\t")
+        if name == ref:
+            return sha
+    return ""
+
+
+def get_tracked_branch(repo_dir: str) -> str:
+    """Return the ``refs/heads/...`` ref a checkout's branch tracks, or ""."""
+    try:
+        upstream = _run_git(
+            ["rev-parse", "--symbolic-full-name", "@{upstream}"], cwd=repo_dir
+        )
+    except RuntimeError:
+        return ""
+    # refs/remotes/origin/main -> refs/heads/main
+    parts = upstream.split("/", 3)
+    if len(parts) < 4 or parts[:2] != ["refs", "remotes"]:
+        return ""
+    return f"refs/heads/{parts[3]}"
+
+
+def get_remote_head_sha(
+    repo_url: str,
+    cache_root: Optional[str] = None,
+    ttl: Optional[float] = None,
+    ref: str = "HEAD",
+) -> str:
+    """Return the SHA for the remote HEAD, or for ``ref`` (a ``refs/heads/...``
+    branch) when given.
+
+    With a ``cache_root``, results are remembered in ``<cache_root>/heads.json``
+    and reused for ``ttl`` seconds (default ``TESTAGENT_HEAD_TTL`` or 60), so
+    back-to-back runs skip the ``ls-remote`` round trip. ``ttl=0`` always
+    queries the remote but still records the answer.
+    """
+    if cache_root is None:
+        return _ls_remote_head(repo_url, ref)
+
+    if ttl is None:
+        ttl = HEAD_TTL_SECONDS
+
+    path = _head_cache_path(cache_root)
+    key = repo_url.strip()
+    if ref != "HEAD":
+        key = f"{key} {ref}"
+    with _head_cache_lock:
+        entry = _load_head_cache(path).get(key)
+    if entry and time.time() - entry.get("checked_at", 0) < ttl:
+        return entry.get("sha", "")
+
+    sha = _ls_remote_head(repo_url, ref)
+    with _head_cache_lock:
+        cache = _load_head_cache(path)
+        cache[key] = {"sha": sha, "checked_at": time.time()}
+        os.makedirs(cache_root, exist_ok=True)
+        atomic_write_text(path, json.dumps(cache, indent=2))
+    return sha
+
+
+def _map_bounded(func, items: list, max_workers: int) -> list:
+    if not items:
+        return []
+    workers = max(1, min(len(items), max_workers, _MAX_GIT_WORKERS))
+    if workers == 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, items))
+
+
+def clone_or_update_many(repo_urls: list, cache_root: str, max_workers: int = 4) -> dict:
+    """Run clone_or_update_repo for several URLs concurrently.
+
+    Returns a dict of repo URL -> local checkout path. The first failure is
+    re-raised once all workers have finished.
+    """
+    urls = list(dict.fromkeys(repo_urls))
+    paths = _map_bounded(
+        lambda url: clone_or_update_repo(repo_url=url, cache_root=cache_root),
+        urls,
+        max_workers,
+    )
+    return dict(zip(urls, paths))
+
+
+def get_remote_head_shas(
+    repo_urls: list,
+    max_workers: int = 4,
+    cache_root: Optional[str] = None,
+) -> dict:
+    """Run get_remote_head_sha for several URLs concurrently.
+
+    Returns a dict of repo URL -> remote HEAD SHA.
+    """
+    urls = list(dict.fromkeys(repo_urls))
+    shas = _map_bounded(
+        lambda url: get_remote_head_sha(url, cache_root=cache_root),
+        urls,
+        max_workers,
+    )
+    return dict(zip(urls, shas))
 
 
 def pull_repo(repo_dir: str) -> None:
     _run_git(["pull", "--ff-only"], cwd=repo_dir)
+    close_batch_client(repo_dir)
@@ -0,0 +1,28 @@
+"""
+JSON encoding helpers. Uses orjson when it is installed and falls back to the
+standard library otherwise; both paths produce 2-space indented UTF-8 JSON.
+"""
+
+import json
+from typing import Callable, Optional
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+
+def dumps_pretty_bytes(obj, default: Optional[Callable] = None) -> bytes:
+    """Serialize ``obj`` as indented JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(
+            obj,
+            default=default,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(obj, indent=2, default=default, ensure_ascii=False).encode("utf-8")
+
+
+def dumps_pretty(obj, default: Optional[Callable] = None) -> str:
+    """Serialize ``obj`` as an indented JSON string."""
+    return dumps_pretty_bytes(obj, default=default).decode("utf-8")
@@ -3,11 +3,26 @@ LLM Client - Interfaces with OpenAI (or compatible) API to generate Robot Framew
 Supports OpenAI, Azure OpenAI, and any OpenAI-compatible endpoint (e.g., Ollama, LM Studio).
 """
 
+import asyncio
+import importlib.util
 import os
+import hashlib
 import json
-from typing import Optional
+import random
+import re
+import time
+from typing import Callable, Optional
 
-from openai import OpenAI
+from agent.fsutil import AtomicFile, atomic_write_text, default_cache_root
+from agent.jsonutil import dumps_pretty
+from agent.template_generator import TemplateGenerator
+
+# Leading ```lang line and trailing ``` line of a markdown code fence.
+_FENCE_RE = re.compile(r"\A```[^\n]*\n|\n```\s*\Z")
+_FENCE_TAIL_RE = re.compile(r"\n```\s*\Z")
+# Suffix a streaming response has to hold back: it may still turn out to be
+# trailing whitespace or the closing fence.
+_HOLD_BACK_RE = re.compile(r"[\s`]*\Z")
 
 
 SYSTEM_PROMPT = """You are an expert test automation engineer specializing in Robot Framework.
@@ -30,63 +45,523 @@ Follow these Robot Framework conventions:
 Output ONLY valid Robot Framework (.robot) file content. No markdown, no explanations.
 """
 
+# Batched requests ask for one JSON array holding every operation's file.
+BATCH_SYSTEM_PROMPT = SYSTEM_PROMPT.replace(
+    "Output ONLY valid Robot Framework (.robot) file content. No markdown, no explanations.",
+    "Respond with ONLY a JSON array of strings, one complete Robot Framework (.robot) "
+    "file per operation, in the order the operations are given. No markdown, no explanations.",
+)
+
+_MAX_TOKENS = 4096
+# Completion budget for a batch: _MAX_TOKENS per operation, capped at what
+# current models accept in one response. Larger batches are split so every
+# operation keeps its full budget.
+_MAX_BATCH_TOKENS = 16384
+MAX_BATCH_OPERATIONS = _MAX_BATCH_TOKENS // _MAX_TOKENS
+
+# Retries for rate limits (429), server errors (5xx) and dropped
+# connections: exponential backoff from 1s, capped at 30s, with jitter so
+# concurrent requests don't retry in lockstep.
+_MAX_ATTEMPTS = 5
+_BACKOFF_BASE = 1.0
+_BACKOFF_MAX = 30.0
+
+_REQUIREMENTS = """## Requirements
+Generate tests covering:
+1. **Positive/Smoke tests**: Basic successful invocation with valid arguments
+2. **Positive tests with variations**: Different valid argument combinations
+3. **Negative tests - Missing required args**: Omit each required argument
+4. **Negative tests - Invalid values**: Wrong types, out-of-range values
+5. **Negative tests - Unknown operation**: Test with non-existent operation name
+6. **Edge cases**: Empty strings, very large values, special characters
+7. **Dry run tests**: Verify --dry-run flag works correctly
+8. **Timeout tests**: Verify --timeout parameter behavior
+
+Use `service-console run` as the command to invoke operations.
+Include proper [Setup] and [Teardown] keywords.
+Use [Tags] to categorize each test (positive, negative, edge_case, smoke).
+"""
+
+
+def _is_retryable(error: Exception) -> bool:
+    from openai import APIConnectionError, APIStatusError
+
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, APIConnectionError)
+
+
+def _backoff_delay(attempt: int) -> float:
+    delay = min(_BACKOFF_BASE * 2 ** attempt, _BACKOFF_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class _FenceStripper:
+    """Incremental equivalent of ``_FENCE_RE.sub("", text).strip()``.
+
+    Text is fed in arbitrary chunks and forwarded to ``sink`` as soon as it
+    can no longer be part of the opening fence line or the trailing
+    fence/whitespace.
+    """
+
+    def __init__(self, sink: Callable[[str], None]):
+        self._sink = sink
+        self._head = ""
+        self._started = False
+        self._emitted = False
+        self._tail = ""
+
+    def feed(self, text: str) -> None:
+        if not text:
+            return
+        if not self._started:
+            self._head += text
+            if self._head.startswith("```"):
+                newline = self._head.find("\n")
+                if newline < 0:
+                    return
+                text = self._head[newline + 1:]
+            elif len(self._head) < 3 and "```".startswith(self._head):
+                return
+            else:
+                text = self._head
+            self._head = ""
+            self._started = True
+
+        buf = self._tail + text
+        cut = _HOLD_BACK_RE.search(buf).start()
+        if cut:
+            self._sink(buf[:cut] if self._emitted else buf[:cut].lstrip())
+            self._emitted = True
+        self._tail = buf[cut:]
+
+    def close(self) -> None:
+        if not self._started:
+            text = _FENCE_RE.sub("", self._head).strip()
+        else:
+            text = _FENCE_TAIL_RE.sub("", self._tail).rstrip()
+            if not self._emitted:
+                text = text.lstrip()
+        if text:
+            self._sink(text)
+
+
+class _StreamSession:
+    """Routes streamed completion deltas to a sink and a cache entry."""
+
+    def __init__(self, sink: Callable[[str], None], cache_file: Optional[AtomicFile]):
+        self._sink = sink
+        self._cache_file = cache_file
+        self._stripper = _FenceStripper(self._write)
+        self.usage = None
+
+    def _write(self, text: str) -> None:
+        self._sink(text)
+        if self._cache_file is not None:
+            try:
+                self._cache_file.write(text)
+            except OSError:
+                self._cache_file.discard()
+                self._cache_file = None
+
+    def feed(self, chunk) -> None:
+        if chunk.choices:
+            self._stripper.feed(chunk.choices[0].delta.content or "")
+        # Sent on the final chunk when the stream was opened with include_usage.
+        usage = getattr(chunk, "usage", None)
+        if usage is not None:
+            self.usage = usage
+
+    def finish(self) -> None:
+        self._stripper.close()
+        if self._cache_file is not None:
+            try:
+                self._cache_file.commit()
+            except OSError:
+                pass
+
+    def abort(self) -> None:
+        if self._cache_file is not None:
+            self._cache_file.discard()
+
+
+def build_http_client(max_connections: int = 64):
+    """Pooled ``httpx.AsyncClient`` to share between every request of a run.
+
+    Connections (and their TLS sessions) are kept alive across requests, and
+    HTTP/2 multiplexes concurrent requests over one connection when the
+    optional ``h2`` package is installed. The read timeout is generous since
+    a non-streamed completion only responds once it is finished.
+    """
+    import httpx
+
+    return httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        timeout=httpx.Timeout(600.0, connect=10.0),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max(1, max_connections // 2),
+        ),
+    )
+
+
+def default_llm_cache_dir() -> str:
+    """Directory for cached LLM responses (override with TESTAGENT_LLM_CACHE_DIR)."""
+    return os.environ.get("TESTAGENT_LLM_CACHE_DIR") or os.path.join(default_cache_root(), "llm")
+
+
+# Size budget for the on-disk response cache.
+DEFAULT_LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
 
 class LLMClient:
-    """Client for generating Robot Framework tests using an LLM."""
+    """Client for generating Robot Framework tests using an LLM.
+
+    Async requests go through ``http_client`` when one is given, so a run
+    can share a single connection pool. Responses are cached on disk under
+    ``cache_dir``, keyed by a hash of the model, system prompt and user
+    prompt, so unchanged operations are served without an API call. Batched
+    results get their own per-operation entries (see
+    generate_tests_batch_async). Hits refresh an entry's mtime; when the
+    client is created, least recently used entries beyond
+    ``cache_max_bytes`` are removed. ``use_cache=False`` bypasses the cache entirely.
+    """
 
     def __init__(
         self,
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
         model: str = "gpt-4o",
+        cache_dir: Optional[str] = None,
+        use_cache: bool = True,
+        cache_max_bytes: int = DEFAULT_LLM_CACHE_MAX_BYTES,
+        http_client=None,
     ):
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY", "")
         self.base_url = base_url or os.environ.get("OPENAI_BASE_URL")
         self.model = model or os.environ.get("LLM_MODEL", "gpt-4o")
-
-        client_kwargs = {"api_key": self.api_key}
+        self.cache_dir = cache_dir or default_llm_cache_dir()
+        self.use_cache = use_cache
+        self.cache_hits = 0
+        # Total tokens reported by the endpoint across all completions.
+        self.tokens_used = 0
+        if use_cache:
+            self._prune_cache(cache_max_bytes)
+
+        # Retries are handled by _create/_create_async; the SDK's own would
+        # multiply with them.
+        client_kwargs = {"api_key": self.api_key, "max_retries": 0}
         if self.base_url:
             client_kwargs["base_url"] = self.base_url
 
+        # Imported here so template-only (mock) runs never load the SDK.
+        from openai import AsyncOpenAI, OpenAI
+
         self.client = OpenAI(**client_kwargs)
+        # ``http_client`` (see build_http_client) is owned by the caller.
+        if http_client is not None:
+            self.async_client = AsyncOpenAI(**client_kwargs, http_client=http_client)
+        else:
+            self.async_client = AsyncOpenAI(**client_kwargs)
 
-    def generate_tests(self, operation_info: dict) -> str:
+    def generate_tests(
+        self,
+        operation_info: dict,
+        sink: Optional[Callable[[str], None]] = None,
+    ) -> Optional[str]:
         """Generate Robot Framework tests for a single operation.
 
         Args:
             operation_info: Dictionary containing operation metadata from the scanner.
+            sink: Optional callable (e.g. an open file's ``write``). When given,
+                the response is requested with ``stream=True`` and passed to
+                ``sink`` piece by piece instead of being buffered.
 
         Returns:
-            Robot Framework test file content as a string.
+            Robot Framework test file content as a string, or None if a sink
+            was given.
         """
         prompt = self._build_prompt(operation_info)
-
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
+        key = self._cache_key(prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return self._deliver(cached, sink)
+
+        kwargs = self._completion_kwargs(prompt)
+        if sink is None:
+            response = self._create(**kwargs)
+            self._count_usage(getattr(response, "usage", None))
+            content = self._clean_content(response.choices[0].message.content)
+            self._cache_put(key, content)
+            return content
+
+        session = _StreamSession(sink, self._open_cache_entry(key))
+        try:
+            for chunk in self._create(**kwargs, **self._stream_kwargs()):
+                session.feed(chunk)
+        except BaseException:
+            session.abort()
+            raise
+        session.finish()
+        self._count_usage(session.usage)
+        return None
+
+    async def generate_tests_async(
+        self,
+        operation_info: dict,
+        sink: Optional[Callable[[str], None]] = None,
+    ) -> Optional[str]:
+        """Async counterpart of generate_tests, used for concurrent generation."""
+        prompt = self._build_prompt(operation_info)
+        key = self._cache_key(prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return self._deliver(cached, sink)
+
+        kwargs = self._completion_kwargs(prompt)
+        if sink is None:
+            response = await self._create_async(**kwargs)
+            self._count_usage(getattr(response, "usage", None))
+            content = self._clean_content(response.choices[0].message.content)
+            self._cache_put(key, content)
+            return content
+
+        session = _StreamSession(sink, self._open_cache_entry(key))
+        try:
+            stream = await self._create_async(**kwargs, **self._stream_kwargs())
+            async for chunk in stream:
+                session.feed(chunk)
+        except BaseException:
+            session.abort()
+            raise
+        session.finish()
+        self._count_usage(session.usage)
+        return None
+
+    async def generate_tests_batch_async(self, operation_infos: list) -> list:
+        """Generate tests for several operations with batched completions.
+
+        Results are cached per operation, keyed by the operation's own prompt
+        and BATCH_SYSTEM_PROMPT, so entries don't depend on batch size or
+        membership. An operation generate_tests already cached is served
+        from that entry; batch output is never stored under the unbatched
+        key. Only cache misses are sent, at most MAX_BATCH_OPERATIONS per
+        request and one request at a time. Each response must be a JSON
+        array with one Robot Framework file per requested operation;
+        anything else raises ValueError so the caller can fall back to
+        per-operation requests (the requests that succeeded stay cached).
+
+        Returns the test file contents in the order of ``operation_infos``.
+        """
+        prompts = [self._build_prompt(info) for info in operation_infos]
+        keys = [self._cache_key(prompt, BATCH_SYSTEM_PROMPT) for prompt in prompts]
+        contents = [
+            self._cache_get(self._cache_key(prompt)) or self._cache_get(key)
+            for prompt, key in zip(prompts, keys)
+        ]
+        missing = [i for i, content in enumerate(contents) if content is None]
+
+        first_error = None
+        for start in range(0, len(missing), MAX_BATCH_OPERATIONS):
+            indices = missing[start:start + MAX_BATCH_OPERATIONS]
+            try:
+                await self._generate_batch(operation_infos, indices, keys, contents)
+            except Exception as e:
+                first_error = first_error or e
+        if first_error is not None:
+            raise first_error
+        return contents
+
+    async def _generate_batch(self, operation_infos, indices, keys, contents) -> None:
+        """Send one batched request for ``indices``, filling and caching ``contents``."""
+        prompt = self._build_batch_prompt([operation_infos[i] for i in indices])
+        kwargs = self._completion_kwargs(
+            prompt,
+            system_prompt=BATCH_SYSTEM_PROMPT,
+            max_tokens=_MAX_TOKENS * len(indices),
+        )
+        response = await self._create_async(**kwargs)
+        self._count_usage(getattr(response, "usage", None))
+        generated = self._parse_batch(response.choices[0].message.content, len(indices))
+        for i, content in zip(indices, generated):
+            contents[i] = content
+            self._cache_put(keys[i], content)
+
+    @classmethod
+    def _parse_batch(cls, content: str, expected: int) -> list:
+        """Decode a batched response into ``expected`` test file contents."""
+        try:
+            files = json.loads(cls._clean_content(content or ""))
+        except ValueError as e:
+            raise ValueError(f"batched response is not valid JSON: {e}") from None
+        if (
+            not isinstance(files, list)
+            or len(files) != expected
+            or not all(isinstance(f, str) for f in files)
+        ):
+            raise ValueError(f"batched response is not a JSON array of {expected} strings")
+        return [cls._clean_content(f) for f in files]
+
+    def _create(self, **kwargs):
+        """Create a completion, retrying rate limits and transient failures.
+
+        For streamed completions only opening the stream is retried; an error
+        mid-stream propagates since part of the response was already consumed.
+        """
+        for attempt in range(_MAX_ATTEMPTS):
+            try:
+                return self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                if attempt == _MAX_ATTEMPTS - 1 or not _is_retryable(e):
+                    raise
+                time.sleep(_backoff_delay(attempt))
+
+    async def _create_async(self, **kwargs):
+        """Async counterpart of _create."""
+        for attempt in range(_MAX_ATTEMPTS):
+            try:
+                return await self.async_client.chat.completions.create(**kwargs)
+            except Exception as e:
+                if attempt == _MAX_ATTEMPTS - 1 or not _is_retryable(e):
+                    raise
+                await asyncio.sleep(_backoff_delay(attempt))
+
+    def _stream_kwargs(self) -> dict:
+        # stream_options is only sent to the OpenAI API itself; compatible
+        # servers don't all accept it.
+        if self.base_url:
+            return {"stream": True}
+        return {"stream": True, "stream_options": {"include_usage": True}}
+
+    def _count_usage(self, usage) -> None:
+        if usage is not None:
+            self.tokens_used += getattr(usage, "total_tokens", 0) or 0
+
+    @staticmethod
+    def _deliver(content: str, sink: Optional[Callable[[str], None]]) -> Optional[str]:
+        if sink is None:
+            return content
+        sink(content)
+        return None
+
+    def _cache_key(self, prompt: str, system_prompt: str = SYSTEM_PROMPT) -> str:
+        payload = "\0".join((self.model, system_prompt, prompt)).encode("utf-8")
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        if not self.use_cache:
+            return None
+        path = self._cache_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+        except OSError:
+            return None
+        try:
+            # Mark as recently used for _prune_cache.
+            os.utime(path)
+        except OSError:
+            pass
+        self.cache_hits += 1
+        return content
+
+    def _prune_cache(self, max_bytes: int) -> None:
+        """Delete least recently used entries until the cache fits ``max_bytes``."""
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(".txt"):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        except OSError:
+            return
+        if total <= max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= max_bytes:
+                break
+
+    def _open_cache_entry(self, key: str) -> Optional[AtomicFile]:
+        if not self.use_cache:
+            return None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            return AtomicFile(self._cache_path(key), "w")
+        except OSError:
+            return None
+
+    def _cache_put(self, key: str, content: str) -> None:
+        if not self.use_cache:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            atomic_write_text(self._cache_path(key), content)
+        except OSError:
+            # A read-only or full cache dir must not fail the generation.
+            pass
+
+    def _completion_kwargs(
+        self,
+        prompt: str,
+        system_prompt: str = SYSTEM_PROMPT,
+        max_tokens: int = _MAX_TOKENS,
+    ) -> dict:
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt},
             ],
-            temperature=0.2,
-            max_tokens=4096,
-        )
-
-        content = response.choices[0].message.content
+            "temperature": 0.2,
+            "max_tokens": max_tokens,
+        }
 
+    @staticmethod
+    def _clean_content(content: str) -> str:
         # Strip markdown code fences if present
-        if content.startswith("```"):
-            lines = content.split("\n")
-            # Remove first and last lines (code fences)
-            if lines[0].startswith("```"):
-                lines = lines[1:]
-            if lines and lines[-1].strip() == "```":
-                lines = lines[:-1]
-            content = "\n".join(lines)
-
-        return content.strip()
+        return _FENCE_RE.sub("", content).strip()
 
     def _build_prompt(self, operation_info: dict) -> str:
         """Build the prompt for test generation."""
+        return (
+            "Generate a comprehensive Robot Framework test suite for the following "
+            "service-console operation:\n\n"
+            f"{self._operation_section(operation_info)}\n\n"
+            f"{_REQUIREMENTS}"
+        )
+
+    def _build_batch_prompt(self, operation_infos: list) -> str:
+        """Build one prompt covering every operation in ``operation_infos``."""
+        count = len(operation_infos)
+        sections = "\n\n".join(self._operation_section(info) for info in operation_infos)
+        return (
+            f"Generate a comprehensive Robot Framework test suite for each of the following "
+            f"{count} service-console operations:\n\n"
+            f"{sections}\n\n"
+            f"{_REQUIREMENTS}\n"
+            f"Respond as a JSON array of exactly {count} strings. Element N is the complete "
+            f".robot file for the Nth operation above.\n"
+        )
+
+    @staticmethod
+    def _operation_section(operation_info: dict) -> str:
+        """Describe one operation: CLI usage, arguments, analysis and source."""
         op_name = operation_info.get("name", "Unknown")
         description = operation_info.get("description", "")
         args = operation_info.get("args", [])
@@ -94,10 +569,12 @@ class LLMClient:
         env_vars = operation_info.get("env_vars", [])
         error_conditions = operation_info.get("error_conditions", [])
         source_code = operation_info.get("source_code", "")
+        args_json = dumps_pretty(args, default=str)
+        functions_json = dumps_pretty(functions)
+        env_vars_json = dumps_pretty(env_vars)
+        errors_json = dumps_pretty(error_conditions)
 
-        prompt = f"""Generate a comprehensive Robot Framework test suite for the following service-console operation:
-
-## Operation: {op_name}
+        return f"""## Operation: {op_name}
 **Description**: {description}
 
 ## CLI Usage
@@ -106,38 +583,21 @@ service-console run {op_name}
 ```
 
 ## Arguments
-{json.dumps(args, indent=2, default=str)}
+{args_json}
 
 ## Internal Functions
-{json.dumps(functions, indent=2)}
+{functions_json}
 
 ## Environment Variables Used
-{json.dumps(env_vars, indent=2)}
+{env_vars_json}
 
 ## Error Conditions Found in Source
-{json.dumps(error_conditions, indent=2)}
+{errors_json}
 
 ## Source Code
 ```python
 {source_code}
-```
-
-## Requirements
-Generate tests covering:
-1. **Positive/Smoke tests**: Basic successful invocation with valid arguments
-2. **Positive tests with variations**: Different valid argument combinations
-3. **Negative tests - Missing required args**: Omit each required argument
-4. **Negative tests - Invalid values**: Wrong types, out-of-range values
-5. **Negative tests - Unknown operation**: Test with non-existent operation name
-6. **Edge cases**: Empty strings, very large values, special characters
-7. **Dry run tests**: Verify --dry-run flag works correctly
-8. **Timeout tests**: Verify --timeout parameter behavior
-
-Use `service-console run` as the command to invoke operations.
-Include proper [Setup] and [Teardown] keywords.
-Use [Tags] to categorize each test (positive, negative, edge_case, smoke).
-"""
-        return prompt
+```"""
 
 
 class MockLLMClient(LLMClient):
@@ -149,9 +609,25 @@ class MockLLMClient(LLMClient):
     def __init__(self, **kwargs):
         # Don't call super().__init__ to avoid needing an API key
         self.model = "mock-template-engine"
+        self.use_cache = False
+        self.cache_hits = 0
+        self.tokens_used = 0
+        self._generator = TemplateGenerator()
 
-    def generate_tests(self, operation_info: dict) -> str:
+    def generate_tests(
+        self,
+        operation_info: dict,
+        sink: Optional[Callable[[str], None]] = None,
+    ) -> Optional[str]:
         """Generate Robot Framework tests using templates instead of LLM."""
-        from agent.template_generator import TemplateGenerator
-        generator = TemplateGenerator()
-        return generator.generate(operation_info)
+        return self._deliver(self._generator.generate(operation_info), sink)
+
+    async def generate_tests_async(
+        self,
+        operation_info: dict,
+        sink: Optional[Callable[[str], None]] = None,
+    ) -> Optional[str]:
+        return self.generate_tests(operation_info, sink)
+
+    async def generate_tests_batch_async(self, operation_infos: list) -> list:
+        return [self._generator.generate(info) for info in operation_infos]
@@ -4,8 +4,12 @@ and test generation. Also supports watching for changes.
 """
 
 import os
+import hashlib
 import json
 import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
@@ -13,29 +17,103 @@ from typing import Optional
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn
 
+from agent.fsutil import AtomicFile, atomic_write_bytes
+from agent.jsonutil import dumps_pretty_bytes
 from agent.scanner import RepoScanner
-from agent.llm_client import LLMClient, MockLLMClient
-from agent.template_generator import TemplateGenerator
+from agent.llm_client import (
+    BATCH_SYSTEM_PROMPT,
+    MAX_BATCH_OPERATIONS,
+    SYSTEM_PROMPT,
+    LLMClient,
+    MockLLMClient,
+)
+from agent.template_generator import ROBOT_TEMPLATE_SOURCE, TemplateGenerator
 
 console = Console()
 
+# Bump when generated output changes for reasons the prompt and template
+# sources below don't capture (e.g. prompt-building or post-processing code).
+GENERATOR_VERSION = "1"
+_GENERATOR_SALT = hashlib.blake2b(
+    "\0".join((GENERATOR_VERSION, SYSTEM_PROMPT, BATCH_SYSTEM_PROMPT, ROBOT_TEMPLATE_SOURCE)).encode("utf-8"),
+    digest_size=16,
+).digest()
+
+# Per-operation checkpoints of an in-progress run, inside the output dir.
+PROGRESS_FILENAME = ".progress.jsonl"
+
+# Upper bound on in-flight LLM requests; override with LLM_CONCURRENCY or
+# the concurrency argument.
+DEFAULT_LLM_CONCURRENCY = 8
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text[:limit] + "..." if len(text) > limit else text
+
+
+def _write_bytes(path: Path, data: bytes) -> None:
+    # Binary write, so there is no text-mode encoding pass. Buffered, because
+    # a raw write may be short and the buffered writer retries until done.
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+class GenerationStopped(RuntimeError):
+    """Raised when generation is abandoned after request_stop()."""
+
+
+class _CountingSink:
+    """File writer used as an LLM sink that tracks how much was written.
+
+    Once ``stop`` is set the next chunk raises GenerationStopped, which
+    abandons the streamed response.
+    """
+
+    def __init__(self, f, stop: Optional[threading.Event] = None):
+        self._file = f
+        self._stop = stop
+        self.count = 0
+
+    def __call__(self, text: str) -> None:
+        if self._stop is not None and self._stop.is_set():
+            raise GenerationStopped("generation stopped")
+        self._file.write(text)
+        self.count += len(text)
+
+    def reset(self) -> None:
+        """Drop anything written so far, e.g. before a fallback rewrite."""
+        self._file.seek(0)
+        self._file.truncate()
+        self.count = 0
+
 
 class TestAutomationAgent:
     """Main agent that scans repos and generates Robot Framework tests."""
 
     def __init__(
         self,
-        service_console_repo: str,
+        service_console_repo: Optional[str],
         output_dir: str,
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
         model: str = "gpt-4o",
         use_mock: bool = False,
+        scan_cache=None,
+        batch_size: int = 1,
+        concurrency: Optional[int] = None,
+        llm_cache_dir: Optional[str] = None,
+        use_llm_cache: bool = True,
+        resume: bool = True,
+        force: bool = False,
+        http_client=None,
+        atomic_writes: bool = True,
     ):
-        self.service_console_repo = os.path.abspath(service_console_repo)
-        self.output_dir = os.path.abspath(output_dir)
+        self.service_console_repo = None
+        self.scanner = None
+        self._scan_cache = scan_cache
+        self.output_dir = Path(output_dir).resolve()
         self.use_mock = use_mock
 
         if use_mock or not (api_key or os.environ.get("OPENAI_API_KEY")):
@@ -43,17 +121,82 @@ class TestAutomationAgent:
             self.llm_client = MockLLMClient()
             self.use_mock = True
         else:
-            self.llm_client = LLMClient(api_key=api_key, base_url=base_url, model=model)
+            self.llm_client = LLMClient(
+                api_key=api_key,
+                base_url=base_url,
+                model=model,
+                cache_dir=llm_cache_dir,
+                use_cache=use_llm_cache,
+                http_client=http_client,
+            )
+
+        if concurrency is None:
+            concurrency = int(os.environ.get("LLM_CONCURRENCY", DEFAULT_LLM_CONCURRENCY))
+        self.concurrency = max(1, concurrency)
+        # Operations sent per LLM request; templates are local, so mock runs
+        # don't batch. Capped so each concurrency slot is a single request.
+        self.batch_size = 1 if self.use_mock else min(max(1, batch_size), MAX_BATCH_OPERATIONS)
 
-        self.scanner = RepoScanner(self.service_console_repo)
+        if service_console_repo is not None:
+            self.bind_repo(service_console_repo)
         self.scan_results = {}
         self.generated_tests = {}
+        # Operations whose LLM generation failed this run and got template
+        # output instead; they are never recorded as reusable.
+        self._fallback_ops = set()
+        self._template_generator = TemplateGenerator()
+        self._loop = None
+        # Whole-content writes (template output) are handed to this pool so
+        # file I/O overlaps with generating the next operation.
+        self._io_pool = ThreadPoolExecutor(max_workers=4)
+        self._pending_writes = []
+        # Write output files via a temp file + os.replace so readers (CI,
+        # robot runs racing the watcher) never see a partially written file.
+        self.atomic_writes = atomic_writes
+        # force: regenerate every operation, ignoring previous and resumed output.
+        self.force = force
+        self.resume = resume and not force
+        self._http_client = http_client
+        self._progress_file = None
+        self._progress_lock = threading.Lock()
+        # Set by request_stop() from another thread; _jobs are the running
+        # generation tasks it cancels.
+        self._stop = threading.Event()
+        self._jobs = []
 
         # Ensure output directory exists
         os.makedirs(self.output_dir, exist_ok=True)
 
+    def bind_repo(self, service_console_repo: str) -> None:
+        """Set the checkout to scan.
+
+        The agent may be created with ``service_console_repo=None`` so its
+        setup overlaps with cloning the repo; bind the checkout before run().
+        """
+        self.service_console_repo = os.path.abspath(service_console_repo)
+        self.scanner = RepoScanner(self.service_console_repo, scan_cache=self._scan_cache)
+
+    def _require_repo(self) -> None:
+        if self.scanner is None:
+            raise RuntimeError("No service-console repo bound; call bind_repo() first")
+
     def run(self) -> dict:
-        """Execute the full agent pipeline: scan -> analyze -> generate tests."""
+        """Execute the full agent pipeline: scan -> analyze -> generate tests.
+
+        Returns a dict of operation name -> written test file path.
+        """
+        for _ in self.run_iter():
+            pass
+        return self.generated_tests
+
+    def run_iter(self):
+        """Run the pipeline like run(), yielding ``(operation name, test file
+        path)`` as each operation's tests are generated or kept.
+
+        Generation only advances while the caller is pulling items. Queued
+        file writes are flushed before the generator is exhausted.
+        """
+        self._require_repo()
         console.print(Panel.fit(
             "[bold cyan]Test Automation Agent[/bold cyan]\n"
             f"Repo: {self.service_console_repo}\n"
@@ -66,28 +209,132 @@ class TestAutomationAgent:
         console.print("\n[bold]Phase 1: Scanning service-console repository...[/bold]")
         self.scan_results = self.scanner.scan()
         self._display_scan_results()
+        self._fallback_ops = set()
 
-        # Phase 2: Generate tests
-        console.print("\n[bold]Phase 2: Generating Robot Framework tests...[/bold]")
-        self._generate_all_tests()
-
-        # Phase 3: Generate shared resources
-        console.print("\n[bold]Phase 3: Generating shared test resources...[/bold]")
-        self._generate_shared_resources()
+        resumable = self._load_progress() if self.resume else {}
+        self._open_progress(append=self.resume)
+        try:
+            # Phase 2: Generate tests
+            console.print("\n[bold]Phase 2: Generating Robot Framework tests...[/bold]")
+            yield from self._iter_generate_all_tests(resumable)
+
+            # Phase 3: Generate shared resources
+            console.print("\n[bold]Phase 3: Generating shared test resources...[/bold]")
+            self._generate_shared_resources()
+            self._flush_writes()
+        finally:
+            self._close_progress()
+        # scan_metadata.json now covers every file, so the checkpoints are done.
+        self._discard_progress()
 
         # Phase 4: Summary
         self._display_summary()
 
-        return self.generated_tests
+    @property
+    def fallback_operations(self) -> frozenset:
+        """Operations whose latest generation fell back to the template."""
+        return frozenset(self._fallback_ops)
+
+    @property
+    def cache_hits(self) -> int:
+        """LLM responses served from the on-disk cache so far."""
+        return self.llm_client.cache_hits
+
+    @property
+    def llm_tokens(self) -> int:
+        """Tokens the LLM endpoint reported using so far."""
+        return self.llm_client.tokens_used
+
+    def request_stop(self) -> None:
+        """Abandon generation in progress; safe to call from any thread.
+
+        In-flight LLM requests are cancelled and no further operation is
+        started; the interrupted run() or generate_for_operations() raises
+        GenerationStopped. Files already written are kept.
+        """
+        self._stop.set()
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            try:
+                loop.call_soon_threadsafe(self._cancel_jobs)
+            except RuntimeError:
+                # The loop closed in the meantime; nothing left to cancel.
+                pass
+
+    def _cancel_jobs(self) -> None:
+        for job in self._jobs:
+            job.cancel()
+
+    def _check_stop(self) -> None:
+        if self._stop.is_set():
+            raise GenerationStopped("generation stopped")
+
+    def close(self) -> None:
+        """Release the HTTP client, file-writer threads and event loop."""
+        self._flush_writes()
+        self._io_pool.shutdown()
+        if self._http_client is not None:
+            # Must close on the loop its connections were opened on.
+            self._run_async(self._http_client.aclose())
+            self._http_client = None
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.close()
+
+    def generation_key(self, op_info) -> str:
+        """Hash of everything a previously generated test file depends on.
+
+        Covers the operation's metadata (name, description and args from
+        cli.py, plus the analysis of its script), the script content via its
+        fingerprint, the model, and the prompt/template sources. A file is
+        only reused while this is unchanged.
+        """
+        data = {
+            key: value
+            for key, value in op_info.__dict__.items()
+            if key not in ("source_bytes", "source_file", "args")
+        }
+        data["args"] = [getattr(a, "__dict__", a) for a in op_info.args]
+        payload = json.dumps([self.llm_client.model, data], sort_keys=True, default=str)
+        return hashlib.blake2b(
+            payload.encode("utf-8"), digest_size=16, key=_GENERATOR_SALT
+        ).hexdigest()
 
-    def scan_for_changes(self, previous_operations: Optional[dict] = None) -> list:
-        """Scan for new or modified operations since last run."""
-        current = self.scanner.scan()
-        new_operations = []
+    def scan_for_changes(
+        self,
+        previous_operations: Optional[dict] = None,
+        changed_paths: Optional[set] = None,
+    ) -> list:
+        """Scan for new or modified operations since last run.
+
+        ``previous_operations`` maps operation name -> ``{"fingerprint": ...,
+        "generation_key": ...}``; an operation counts as modified when either
+        differs (a missing generation_key is not compared). When omitted, the
+        values recorded in the output directory's scan_metadata.json are
+        used; without those every operation counts as new.
+        ``changed_paths`` limits the rescan to those files (see
+        RepoScanner.scan_incremental); by default the whole repo is scanned.
+        """
+        self._require_repo()
+        if changed_paths is None:
+            current = self.scanner.scan()
+        else:
+            current = self.scanner.scan_incremental(changed_paths)
+        self.scan_results = current
 
         if previous_operations is None:
-            return list(current.keys())
+            metadata = self._load_previous_metadata()
+            keys = metadata.get("generation_keys")
+            # Metadata from before generation keys has none to compare; an
+            # operation left out of them fell back to the template and is
+            # regenerated ("" never matches).
+            previous_operations = {
+                name: {"fingerprint": fp, "generation_key": None if keys is None else keys.get(name, "")}
+                for name, fp in metadata.get("fingerprints", {}).items()
+            }
+            if not previous_operations:
+                return list(current.keys())
 
+        new_operations = []
         prev_names = set(previous_operations.keys())
         curr_names = set(current.keys())
 
@@ -97,9 +344,13 @@ class TestAutomationAgent:
             new_operations.append(name)
             console.print(f"[green]+ New operation detected: {name}[/green]")
 
-        # Modified operations (compare source code)
+        # Modified operations (script content, or cli.py args/description)
         for name in curr_names & prev_names:
-            if current[name].source_code != previous_operations.get(name, {}).get("source_code", ""):
+            previous = previous_operations[name]
+            previous_key = previous.get("generation_key")
+            if current[name].fingerprint != previous.get("fingerprint") or (
+                previous_key is not None and previous_key != self.generation_key(current[name])
+            ):
                 new_operations.append(name)
                 console.print(f"[yellow]~ Modified operation detected: {name}[/yellow]")
 
@@ -108,86 +359,372 @@ class TestAutomationAgent:
         for name in removed:
             console.print(f"[red]- Removed operation: {name}[/red]")
 
-        self.scan_results = current
         return new_operations
 
+    def _load_previous_metadata(self) -> dict:
+        """Return the scan_metadata.json written by the last run, or {}."""
+        try:
+            with open(self.output_dir / "scan_metadata.json", "r") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return metadata if isinstance(metadata, dict) else {}
+
     def generate_for_operations(self, operation_names: list) -> dict:
-        """Generate tests only for specified operations."""
+        """Generate tests only for specified operations.
+
+        Returns a dict of operation name -> written test file path.
+        """
         results = {}
         for name in operation_names:
+            self._check_stop()
             if name in self.scan_results:
                 console.print(f"  Generating tests for: [cyan]{name}[/cyan]")
                 op_info = self.scan_results[name]
-                test_content = self._generate_test(name, op_info)
-                results[name] = test_content
+                self._fallback_ops.discard(name)
+                results[name] = self._generate_test(name, op_info)
+        self._flush_writes()
         return results
 
-    def _generate_all_tests(self):
-        """Generate tests for all discovered operations."""
+    def _run_async(self, coro):
+        """Run a coroutine on the agent's event loop.
+
+        The loop is kept for the agent's lifetime so the async LLM client's
+        pooled connections stay bound to a single loop across calls.
+        """
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+
+    def _progress_path(self) -> Path:
+        return self.output_dir / PROGRESS_FILENAME
+
+    def _load_progress(self) -> dict:
+        """Generation keys of operations an interrupted run already wrote.
+
+        A line torn by the interruption is ignored.
+        """
+        completed = {}
+        try:
+            with open(self._progress_path(), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(entry, dict):
+                        completed[entry.get("op_id")] = entry.get("generation_key")
+        except OSError:
+            return {}
+        return completed
+
+    def _open_progress(self, append: bool) -> None:
+        try:
+            self._progress_file = open(
+                self._progress_path(), "a" if append else "w", encoding="utf-8"
+            )
+        except OSError:
+            # Checkpoints are best effort; the run itself can still succeed.
+            self._progress_file = None
+
+    def _record_progress(self, op_name: str, filepath: Path) -> None:
+        """Checkpoint a fully written test file (no-op outside run())."""
+        if self._progress_file is None:
+            return
+        info = self.scan_results.get(op_name)
+        line = json.dumps({
+            "op_id": op_name,
+            "output_path": str(filepath),
+            "generation_key": self.generation_key(info) if info is not None else "",
+            "llm_model": self.llm_client.model,
+        })
+        with self._progress_lock:
+            try:
+                self._progress_file.write(line + "\n")
+                self._progress_file.flush()
+            except (OSError, ValueError):
+                pass
+
+    def _close_progress(self) -> None:
+        with self._progress_lock:
+            if self._progress_file is not None:
+                self._progress_file.close()
+                self._progress_file = None
+
+    def _discard_progress(self) -> None:
+        try:
+            os.unlink(self._progress_path())
+        except OSError:
+            pass
+
+    def _iter_async(self, agen):
+        """Drive an async generator on the agent's event loop, item by item."""
+        try:
+            while True:
+                try:
+                    item = self._run_async(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            self._run_async(agen.aclose())
+
+    def _generate_all_tests(self, resumable: Optional[dict] = None):
+        """Generate tests for all discovered operations concurrently."""
+        for _ in self._iter_generate_all_tests(resumable):
+            pass
+
+    def _iter_generate_all_tests(self, resumable: Optional[dict] = None):
+        """Yield ``(operation name, test file path)`` as operations finish.
+
+        ``resumable`` maps operation name -> generation key for files an
+        interrupted run already wrote; those are kept if the key still matches.
+        """
         with Progress(
-            SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            MofNCompleteColumn(),
             console=console,
         ) as progress:
-            for op_name, op_info in self.scan_results.items():
-                task = progress.add_task(f"Generating tests for {op_name}...", total=None)
-                test_content = self._generate_test(op_name, op_info)
-                self.generated_tests[op_name] = test_content
-                progress.update(task, completed=True)
-
-    def _generate_test(self, op_name: str, op_info) -> str:
-        """Generate test for a single operation and write to file."""
-        op_dict = op_info.to_dict() if hasattr(op_info, "to_dict") else op_info
+            yield from self._iter_async(
+                self._generate_all_tests_async(progress, resumable or {})
+            )
 
+    def _reusable_generation_keys(self) -> dict:
+        """Generation keys recorded by the previous run ({} when forcing)."""
+        if self.force:
+            return {}
+        return self._load_previous_metadata().get("generation_keys", {})
+
+    async def _generate_all_tests_async(self, progress, resumable: dict):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        previous_keys = self._reusable_generation_keys()
+
+        async def generate_one(op_name, op_info):
+            async with semaphore:
+                self._check_stop()
+                test_path = await self._generate_test_async(op_name, op_info)
+            return [(op_name, test_path)]
+
+        async def generate_batch(batch):
+            async with semaphore:
+                self._check_stop()
+                return await self._generate_batch_async(batch)
+
+        todo = []
+        for name, info in self.scan_results.items():
+            filename, filepath = self._test_file_path(name)
+            key = self.generation_key(info)
+            if previous_keys.get(name) == key and filepath.exists():
+                # Nothing it depends on changed since the last run: keep the file.
+                console.print(f"  [dim]= {filename} (unchanged)[/dim]")
+                self.generated_tests[name] = filepath
+                yield name, filepath
+                continue
+            if resumable.get(name) == key and filepath.exists():
+                # Written by an interrupted run against the same source.
+                console.print(f"  [dim]= {filename} (resumed)[/dim]")
+                self.generated_tests[name] = filepath
+                self._record_progress(name, filepath)
+                yield name, filepath
+                continue
+            todo.append((name, info))
+
+        if self.batch_size > 1:
+            jobs = [
+                generate_batch(todo[i:i + self.batch_size])
+                for i in range(0, len(todo), self.batch_size)
+            ]
+        else:
+            jobs = [generate_one(name, info) for name, info in todo]
+        pending = [asyncio.ensure_future(job) for job in jobs]
+        self._jobs = pending
+
+        task = progress.add_task("Generating tests", total=len(todo))
+        try:
+            # A stop requested before _jobs was set had nothing to cancel.
+            self._check_stop()
+            for next_done in asyncio.as_completed(pending):
+                try:
+                    done = await next_done
+                except asyncio.CancelledError:
+                    self._check_stop()
+                    raise
+                for op_name, test_path in done:
+                    self.generated_tests[op_name] = test_path
+                    progress.update(task, advance=1, description=f"Generated {op_name}")
+                    yield op_name, test_path
+        finally:
+            # The caller stopped early or a job failed: don't leave the rest
+            # running on the loop.
+            self._jobs = []
+            for future in pending:
+                future.cancel()
+
+    async def _generate_batch_async(self, batch: list) -> list:
+        """Generate several operations' tests with one LLM request.
+
+        If the batched request fails or its response can't be split into one
+        file per operation, each operation is retried on its own.
+        """
+        op_dicts = [info.to_dict() if hasattr(info, "to_dict") else info for _, info in batch]
         try:
-            test_content = self.llm_client.generate_tests(op_dict)
+            contents = await self.llm_client.generate_tests_batch_async(op_dicts)
         except Exception as e:
-            console.print(f"[red]LLM generation failed for {op_name}: {e}[/red]")
-            console.print("[yellow]Falling back to template generator...[/yellow]")
-            generator = TemplateGenerator()
-            test_content = generator.generate(op_dict)
+            self._check_stop()
+            names = ", ".join(name for name, _ in batch)
+            console.print(f"[yellow]Batched generation failed for {names}: {e}[/yellow]")
+            console.print("[yellow]Generating them one at a time...[/yellow]")
+            return [(name, await self._generate_test_async(name, info)) for name, info in batch]
+
+        results = []
+        for (name, _), content in zip(batch, contents):
+            filename, filepath = self._test_file_path(name)
+            results.append((name, self._submit_write(filename, filepath, content, op_name=name)))
+        return results
 
-        # Write test file
-        filename = f"test_{op_name.lower()}.robot"
-        filepath = os.path.join(self.output_dir, filename)
-        with open(filepath, "w") as f:
-            f.write(test_content)
+    def _generate_test(self, op_name: str, op_info) -> Path:
+        """Generate test for a single operation, streaming it to its file.
 
+        Returns the path of the written test file.
+        """
+        op_dict = op_info.to_dict() if hasattr(op_info, "to_dict") else op_info
+        filename, filepath = self._test_file_path(op_name)
+
+        if self.use_mock:
+            return self._submit_write(filename, filepath, self.llm_client.generate_tests(op_dict))
+
+        with self._open_output(filepath) as f:
+            sink = _CountingSink(f, self._stop)
+            try:
+                self.llm_client.generate_tests(op_dict, sink=sink)
+            except GenerationStopped:
+                raise
+            except Exception as e:
+                sink.reset()
+                sink(self._fallback_generate(op_name, op_dict, e))
+
+        console.print(f"  [green]✓[/green] {filename} ({sink.count} bytes)")
+        return filepath
+
+    async def _generate_test_async(self, op_name: str, op_info) -> Path:
+        """Async counterpart of _generate_test."""
+        op_dict = op_info.to_dict() if hasattr(op_info, "to_dict") else op_info
+        filename, filepath = self._test_file_path(op_name)
+
+        if self.use_mock:
+            content = await self.llm_client.generate_tests_async(op_dict)
+            return self._submit_write(filename, filepath, content, op_name=op_name)
+
+        with self._open_output(filepath) as f:
+            sink = _CountingSink(f, self._stop)
+            try:
+                await self.llm_client.generate_tests_async(op_dict, sink=sink)
+            except GenerationStopped:
+                raise
+            except Exception as e:
+                sink.reset()
+                sink(self._fallback_generate(op_name, op_dict, e))
+                fell_back = True
+            else:
+                fell_back = False
+        # A template fallback is not checkpointed, so a resumed run retries it.
+        if not fell_back:
+            self._record_progress(op_name, filepath)
+
+        console.print(f"  [green]✓[/green] {filename} ({sink.count} bytes)")
+        return filepath
+
+    def _submit_write(
+        self,
+        filename: str,
+        filepath: Path,
+        test_content: str,
+        op_name: Optional[str] = None,
+    ) -> Path:
+        """Queue a fully generated test file on the I/O pool.
+
+        With ``op_name`` the file is checkpointed once it has been written.
+        """
+        self._pending_writes.append(
+            self._io_pool.submit(
+                self._write_test_file, filepath, test_content.encode("utf-8"), op_name
+            )
+        )
         console.print(f"  [green]✓[/green] {filename} ({len(test_content)} bytes)")
-        return test_content
+        return filepath
+
+    def _write_test_file(self, filepath: Path, data: bytes, op_name: Optional[str]) -> None:
+        self._write_output(filepath, data)
+        if op_name is not None:
+            self._record_progress(op_name, filepath)
+
+    def _open_output(self, path: Path):
+        """Open an output file for streamed text writes."""
+        if self.atomic_writes:
+            return AtomicFile(str(path), "w")
+        return open(path, "w")
+
+    def _write_output(self, path: Path, data: bytes) -> None:
+        if self.atomic_writes:
+            atomic_write_bytes(str(path), data)
+        else:
+            _write_bytes(path, data)
+
+    def _flush_writes(self):
+        """Wait for queued file writes, re-raising the first failure."""
+        pending, self._pending_writes = self._pending_writes, []
+        for future in pending:
+            future.result()
+
+    def _test_file_path(self, op_name: str) -> tuple:
+        filename = f"test_{op_name.lower()}.robot"
+        return filename, self.output_dir / filename
+
+    def _fallback_generate(self, op_name: str, op_dict: dict, error: Exception) -> str:
+        console.print(f"[red]LLM generation failed for {op_name}: {error}[/red]")
+        console.print("[yellow]Falling back to template generator...[/yellow]")
+        self._fallback_ops.add(op_name)
+        return self._template_generator.generate(op_dict)
 
     def _generate_shared_resources(self):
         """Generate shared Robot Framework resource files."""
+        op_names = list(self.scan_results)
+        test_files = [f"test_{name.lower()}.robot" for name in op_names]
+
         # Generate common keywords resource
-        resource_content = self._build_common_resource()
-        resource_path = os.path.join(self.output_dir, "common.resource")
-        with open(resource_path, "w") as f:
-            f.write(resource_content)
+        resource_content = self._build_common_resource("    ".join(op_names))
+        self._write_output(self.output_dir / "common.resource", resource_content.encode("utf-8"))
         console.print(f"  [green]✓[/green] common.resource")
 
         # Generate suite init file
-        init_content = self._build_suite_init()
-        init_path = os.path.join(self.output_dir, "__init__.robot")
-        with open(init_path, "w") as f:
-            f.write(init_content)
+        init_content = self._build_suite_init(", ".join(op_names))
+        self._write_output(self.output_dir / "__init__.robot", init_content.encode("utf-8"))
         console.print(f"  [green]✓[/green] __init__.robot")
 
         # Save scan metadata
         metadata = {
             "generated_at": datetime.now().isoformat(),
             "repo_path": self.service_console_repo,
-            "operations": list(self.scan_results.keys()),
-            "test_files": [f"test_{name.lower()}.robot" for name in self.scan_results],
+            "operations": op_names,
+            "test_files": test_files,
             "llm_model": self.llm_client.model,
+            "fingerprints": {name: op.fingerprint for name, op in self.scan_results.items()},
+            # Template fallbacks are left out so the next run retries the LLM.
+            "generation_keys": {
+                name: self.generation_key(op)
+                for name, op in self.scan_results.items()
+                if name not in self._fallback_ops
+            },
         }
-        meta_path = os.path.join(self.output_dir, "scan_metadata.json")
-        with open(meta_path, "w") as f:
-            json.dump(metadata, f, indent=2)
+        self._write_output(self.output_dir / "scan_metadata.json", dumps_pretty_bytes(metadata))
         console.print(f"  [green]✓[/green] scan_metadata.json")
 
-    def _build_common_resource(self) -> str:
-        """Build the common.resource file with shared keywords."""
-        operations_list = "    ".join(self.scan_results.keys())
+    def _build_common_resource(self, operations_list: str) -> str:
+        """Build the common.resource file with shared keywords.
+
+        ``operations_list`` is the four-space separated operation names.
+        """
         return f"""*** Settings ***
 Documentation     Common keywords and variables for service-console tests
 Library           Process
@@ -243,12 +780,15 @@ Verify Service Console Is Installed
     RETURN    ${{result.stdout}}
 """
 
-    def _build_suite_init(self) -> str:
-        """Build the __init__.robot suite initialization file."""
+    def _build_suite_init(self, operations_csv: str) -> str:
+        """Build the __init__.robot suite initialization file.
+
+        ``operations_csv`` is the comma separated operation names.
+        """
         return f"""*** Settings ***
 Documentation     Service Console End-to-End Test Suite
 ...               Auto-generated by Test Automation Agent on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-...               Operations tested: {', '.join(self.scan_results.keys())}
+...               Operations tested: {operations_csv}
 Resource          common.resource
 Suite Setup       Suite Level Setup
 Suite Teardown    Suite Level Teardown
@@ -273,15 +813,18 @@ Suite Level Teardown
         table.add_column("Functions", style="yellow", justify="right")
         table.add_column("Error Paths", style="red", justify="right")
 
-        for name, op in self.scan_results.items():
-            args_str = ", ".join(a.name for a in op.args) if op.args else "-"
-            table.add_row(
+        rows = [
+            (
                 name,
-                op.description[:50] + "..." if len(op.description) > 50 else op.description,
-                args_str,
+                _truncate(op.description, 50),
+                ", ".join([a.name for a in op.args]) or "-",
                 str(len(op.functions)),
                 str(len(op.error_conditions)),
             )
+            for name, op in self.scan_results.items()
+        ]
+        for row in rows:
+            table.add_row(*row)
 
         console.print(table)
 
@@ -0,0 +1,26 @@
+"""
+Mock Agent Orchestrator - Template-only variant of the agent for --mock runs.
+
+Generates tests with the template engine alone, so the OpenAI SDK (and the
+HTTP stack under it) is never imported. The template is compiled when this
+module is imported, since every mock run renders it.
+"""
+
+from agent.orchestrator import TestAutomationAgent
+from agent.template_generator import precompile_templates
+
+precompile_templates()
+
+
+class MockTestAutomationAgent(TestAutomationAgent):
+    """TestAutomationAgent that always uses the template-based generator.
+
+    LLM-only options (API key, base URL, model, batching, response cache,
+    HTTP client) are accepted for signature compatibility and ignored.
+    """
+
+    def __init__(self, service_console_repo: str, output_dir: str, **kwargs):
+        for option in ("api_key", "base_url", "http_client"):
+            kwargs.pop(option, None)
+        kwargs["use_mock"] = True
+        super().__init__(service_console_repo, output_dir, **kwargs)
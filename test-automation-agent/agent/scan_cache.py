@@ -0,0 +1,140 @@
+"""
+Scan Cache - Persists per-script scan results in SQLite so unchanged
+operation scripts are not parsed again on the next run.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from agent.fsutil import default_cache_root
+from agent.scanner import SCANNER_VERSION
+
+
+def default_scan_cache_path() -> str:
+    """SQLite file for cached scan results (override the directory with TESTAGENT_SCAN_CACHE_DIR)."""
+    cache_dir = os.environ.get("TESTAGENT_SCAN_CACHE_DIR") or os.path.join(default_cache_root(), "scan-cache")
+    return os.path.join(cache_dir, "scan.sqlite")
+
+
+class ScanCache:
+    """Per-file scan results keyed by path, content hash and scanner version.
+
+    ``lookup`` is the fast path: if a file's mtime and size still match the
+    cached entry its content is not even read. Otherwise the scanner hashes
+    the content and ``lookup_hash`` finds entries whose bytes are unchanged
+    (e.g. after a fresh checkout reset every mtime). Entries unused for
+    ``max_age`` seconds, and the oldest beyond ``max_entries``, are evicted
+    when the cache is opened; a different SCANNER_VERSION empties it.
+
+    Any SQLite error disables the cache rather than failing the scan. Safe
+    to share between the scanner's worker threads.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_age: float = 24 * 3600,
+        max_entries: int = 2000,
+        version: str = SCANNER_VERSION,
+    ):
+        self.path = path or default_scan_cache_path()
+        self.version = version
+        self.hits = 0
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._setup(max_age, max_entries)
+        except (OSError, sqlite3.Error):
+            self._conn = None
+
+    def _setup(self, max_age: float, max_entries: int) -> None:
+        conn = self._conn
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER,"
+            " hash TEXT, version TEXT, data TEXT, used_at REAL)"
+        )
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != self.version:
+            conn.execute("DELETE FROM entries")
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                (self.version,),
+            )
+        conn.execute("DELETE FROM entries WHERE used_at < ?", (time.time() - max_age,))
+        conn.execute(
+            "DELETE FROM entries WHERE path NOT IN"
+            " (SELECT path FROM entries ORDER BY used_at DESC LIMIT ?)",
+            (max_entries,),
+        )
+        conn.commit()
+
+    def _execute(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        """Run one statement under the lock; returns the first row, if any."""
+        if self._conn is None:
+            return None
+        with self._lock:
+            try:
+                row = self._conn.execute(sql, params).fetchone()
+                self._conn.commit()
+                return row
+            except sqlite3.Error:
+                self._conn = None
+                return None
+
+    def lookup(self, path: str, st: os.stat_result) -> Optional[tuple]:
+        """Return ``(hash, data)`` if ``path``'s mtime and size match its entry."""
+        row = self._execute(
+            "SELECT mtime_ns, size, hash, data FROM entries WHERE path = ? AND version = ?",
+            (path, self.version),
+        )
+        if row is None or row[0] != st.st_mtime_ns or row[1] != st.st_size:
+            return None
+        self._touch(path)
+        self.hits += 1
+        return row[2], json.loads(row[3])
+
+    def lookup_hash(self, path: str, content_hash: str) -> Optional[dict]:
+        """Return the cached data for ``path`` if its content hash matches."""
+        row = self._execute(
+            "SELECT data FROM entries WHERE path = ? AND hash = ? AND version = ?",
+            (path, content_hash, self.version),
+        )
+        if row is None:
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def store(self, path: str, st: os.stat_result, content_hash: str, data: dict) -> None:
+        """Record ``data`` for ``path`` as of the stat taken before it was read."""
+        self._execute(
+            "INSERT OR REPLACE INTO entries"
+            " (path, mtime_ns, size, hash, version, data, used_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                path,
+                st.st_mtime_ns,
+                st.st_size,
+                content_hash,
+                self.version,
+                json.dumps(data),
+                time.time(),
+            ),
+        )
+
+    def _touch(self, path: str) -> None:
+        self._execute("UPDATE entries SET used_at = ? WHERE path = ?", (time.time(), path))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
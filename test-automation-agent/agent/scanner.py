@@ -5,11 +5,116 @@ their arguments, validation rules, and error conditions.
 
 import os
 import ast
-import json
+import hashlib
 import re
-from dataclasses import dataclass, field, asdict
+import sys
+import threading
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import Optional
 
+from agent.jsonutil import dumps_pretty
+
+
+# Scripts are scanned as raw bytes, so the patterns are bytes patterns too.
+_ENV_RE = re.compile(rb'os\.environ\.get\(["\'](\w+)["\']')
+
+# Error conditions to look for in operation scripts (sys.exit, raise, stderr prints)
+_ERROR_PATTERNS = [
+    # Prints and returns are statements, so they are anchored to a line start
+    ("error_print", r'^[ \t]*print\([^)]*"Error:'),
+    ("exit_code", r"sys\.exit\((\d+)\)"),
+    ("stderr_output", r'file=sys\.stderr'),
+    ("error_status", r'status.*error'),
+    ("failure_return", r'^[ \t]*return 1\b'),
+]
+
+# All of the above as one alternation, so a script is scanned once; the
+# named group that matched says which condition it was. Alternatives are
+# tried in list order at each position and matches do not overlap.
+_ERROR_RE = re.compile(
+    "|".join(f"(?P<{error_type}>{pattern})" for error_type, pattern in _ERROR_PATTERNS).encode("ascii"),
+    re.MULTILINE,
+)
+
+
+# Bump whenever the data extracted from a script changes; persistent scan
+# caches written by another version are discarded.
+SCANNER_VERSION = "1"
+
+# Upper bound on threads used to parse operation scripts.
+_MAX_PARSE_WORKERS = 8
+
+# Parsed trees kept in memory per scanner, one per source file.
+_AST_MEMORY_ENTRIES = 256
+
+
+def source_fingerprint(source: bytes) -> str:
+    """Short content hash used to tell whether an operation script changed."""
+    return hashlib.blake2b(source, digest_size=8).hexdigest()
+
+
+def _intern(value):
+    """``sys.intern`` for strings; other constants pass through unchanged."""
+    return sys.intern(value) if type(value) is str else value
+
+
+def _decode_source(source: bytes) -> str:
+    """Decode script bytes the way a text-mode read would (universal newlines)."""
+    return source.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+# Directories that never contain the service console, skipped by the cli.py search.
+_SKIP_DIRS = frozenset({
+    ".git", ".hg", ".svn", "node_modules", "__pycache__",
+    "venv", ".venv", "env", ".tox", ".mypy_cache", ".pytest_cache",
+    "build", "dist", "site-packages",
+})
+
+
+def _first_existing(candidates: list, listings: Optional[dict] = None) -> Optional[str]:
+    """Return the first candidate path that exists, or None.
+
+    Each parent directory is listed once with ``os.scandir`` and the
+    candidates are checked against the listed names. Passing the same
+    ``listings`` dict to several calls shares those listings, so probing
+    every operation script under ``operations/`` costs a single scandir.
+    """
+    if listings is None:
+        listings = {}
+    for path in candidates:
+        parent, name = os.path.split(path)
+        names = listings.get(parent)
+        if names is None:
+            try:
+                with os.scandir(parent or ".") as it:
+                    names = frozenset(entry.name for entry in it)
+            except OSError:
+                names = frozenset()
+            listings[parent] = names
+        if name in names:
+            return path
+    return None
+
+
+def _find_nested_cli(repo_path: str) -> Optional[str]:
+    """Breadth-first search for the shallowest ``service_console/cli.py``."""
+    queue = deque([repo_path])
+    while queue:
+        try:
+            with os.scandir(queue.popleft()) as it:
+                entries = [e for e in it if e.is_dir(follow_symlinks=False)]
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name == "service_console":
+                candidate = os.path.join(entry.path, "cli.py")
+                if os.path.isfile(candidate):
+                    return candidate
+        queue.extend(e.path for e in entries if e.name not in _SKIP_DIRS)
+    return None
+
 
 @dataclass
 class OperationArg:
@@ -29,88 +134,296 @@ class OperationInfo:
     functions: list = field(default_factory=list)
     env_vars: list = field(default_factory=list)
     error_conditions: list = field(default_factory=list)
-    source_code: str = ""
+    source_bytes: bytes = field(default=b"", repr=False)
+    fingerprint: str = ""
+    # Resolved script path; source_bytes is read from it on demand when the
+    # scan itself did not need the content (scan-cache hit).
+    source_file: str = field(default="", repr=False)
+
+    @property
+    def source_code(self) -> str:
+        """Script source as text, decoded on access."""
+        if not self.source_bytes and self.source_file:
+            try:
+                with open(self.source_file, "rb") as f:
+                    self.source_bytes = f.read()
+            except OSError:
+                pass
+        return _decode_source(self.source_bytes)
 
     def to_dict(self):
-        return asdict(self)
+        # Shallow: the field values are already plain containers, so there
+        # is no need for asdict's recursive deep copy.
+        data = {**self.__dict__, "args": [a.__dict__ for a in self.args]}
+        del data["source_bytes"], data["source_file"]
+        data["source_code"] = self.source_code
+        return data
+
+
+def _analyze_script(source: bytes, tree: ast.Module) -> dict:
+    """Extract functions, env vars, error conditions and the module docstring.
+
+    Returns plain JSON-compatible data so results can be cached on disk
+    (see agent.scan_cache).
+    """
+    # Extract function names and docstrings
+    functions = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef):
+            functions.append({
+                "name": node.name,
+                "docstring": ast.get_docstring(node) or "",
+                "args": [a.arg for a in node.args.args if a.arg != "self"],
+            })
+
+    # Extract environment variables (os.environ.get calls)
+    env_vars = [name.decode("ascii") for name in _ENV_RE.findall(source)]
+
+    # Extract error conditions (sys.exit, raise, stderr prints)
+    counts = Counter(m.lastgroup for m in _ERROR_RE.finditer(source))
+    error_conditions = [
+        {"type": error_type, "count": counts[error_type], "pattern": pattern}
+        for error_type, pattern in _ERROR_PATTERNS
+        if counts[error_type]
+    ]
+
+    return {
+        "functions": functions,
+        "env_vars": env_vars,
+        "error_conditions": error_conditions,
+        "module_doc": ast.get_docstring(tree),
+    }
+
+
+def _analyze_source(source: bytes) -> dict:
+    """Parse and analyze one script; module-level so process pools can run it."""
+    return _analyze_script(source, ast.parse(source))
 
 
 class RepoScanner:
-    """Scans the service-console repository to extract operation metadata."""
+    """Scans the service-console repository to extract operation metadata.
+
+    ``scan_cache`` (an agent.scan_cache.ScanCache) persists per-script
+    results between runs so unchanged scripts are not parsed again.
+    """
 
-    def __init__(self, repo_path: str):
+    def __init__(
+        self,
+        repo_path: str,
+        scan_cache=None,
+    ):
         self.repo_path = repo_path
         self.operations = {}
-
-    def scan(self) -> dict:
-        """Full scan of the repository. Returns dict of operation name -> OperationInfo."""
+        self.scan_cache = scan_cache
+        # path -> (content key, tree), least recently used first. Only the
+        # latest version of each file is kept.
+        self._ast_cache = OrderedDict()
+        self._ast_cache_lock = threading.Lock()
+        # State kept from the last scan for scan_incremental
+        self._cli_path = None
+        self._cli_ops = {}
+        self._script_paths = {}
+        # Directory listings shared by the path probes of one scan
+        self._listings = {}
+
+    def scan(self, workers: Optional[int] = None) -> dict:
+        """Full scan of the repository. Returns dict of operation name -> OperationInfo.
+
+        ``workers`` selects how scripts are parsed, see _parse_operation_scripts.
+        """
         print(f"[Scanner] Scanning repository: {self.repo_path}")
+        self._listings = {}
 
         # Step 1: Parse the CLI to find registered operations
         cli_operations = self._parse_cli()
+        self._cli_ops = {
+            name: (op.description, op.script_path, op.args)
+            for name, op in cli_operations.items()
+        }
+        self._script_paths = {}
 
         # Step 2: Parse each operation script for detailed info
-        for op_name, op_info in cli_operations.items():
-            self._parse_operation_script(op_info)
-            self.operations[op_name] = op_info
+        self._parse_operation_scripts(list(cli_operations.values()), workers)
+        self.operations = dict(cli_operations)
 
         print(f"[Scanner] Found {len(self.operations)} operations")
         return self.operations
 
+    def scan_incremental(self, changed_paths) -> dict:
+        """Rescan after ``changed_paths`` were modified, reusing unchanged results.
+
+        cli.py is only re-parsed if it is among the changed paths (which
+        falls back to a full scan). An operation script is re-parsed if it
+        changed or its content no longer matches the stored fingerprint;
+        every other OperationInfo is carried over from the previous scan.
+        """
+        changed = {os.path.abspath(path) for path in changed_paths}
+        if not self.operations or self._cli_path is None or self._cli_path in changed:
+            return self.scan()
+
+        print(f"[Scanner] Rescanning {len(changed)} changed file(s) in: {self.repo_path}")
+        self._listings = {}
+        operations = {}
+        to_parse = []
+        for op_name, (description, script_path, args) in self._cli_ops.items():
+            previous = self.operations.get(op_name)
+            path = self._script_paths.get(op_name)
+            if previous is not None and path is not None and path not in changed:
+                try:
+                    with open(path, "rb") as f:
+                        unchanged = source_fingerprint(f.read()) == previous.fingerprint
+                except OSError:
+                    unchanged = False
+                if unchanged:
+                    operations[op_name] = previous
+                    continue
+
+            op_info = OperationInfo(
+                name=op_name,
+                description=description,
+                script_path=script_path,
+                args=list(args),
+            )
+            to_parse.append(op_info)
+            operations[op_name] = op_info
+        self._parse_operation_scripts(to_parse)
+        self.operations = operations
+
+        print(f"[Scanner] Found {len(self.operations)} operations")
+        return self.operations
+
+    def _parse_operation_scripts(self, op_infos: list, workers: Optional[int] = None):
+        """Parse several operation scripts.
+
+        By default scripts are parsed on a thread pool. Each call only fills
+        in its own OperationInfo; the shared caches it touches tolerate
+        concurrent inserts, at worst duplicating a lookup. ``workers=1``
+        parses serially (handy when debugging); ``workers > 1`` reads the
+        scripts here and hands the CPU-bound parsing of every cache miss to
+        that many processes.
+        """
+        if workers is not None and workers > 1:
+            self._parse_operation_scripts_in_processes(op_infos, workers)
+            return
+
+        if workers == 1 or len(op_infos) <= 1:
+            for op_info in op_infos:
+                self._parse_operation_script(op_info)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(_MAX_PARSE_WORKERS, len(op_infos))) as pool:
+            # list() re-raises the first parse error, as the serial loop did
+            list(pool.map(self._parse_operation_script, op_infos))
+
+    def _parse_operation_scripts_in_processes(self, op_infos: list, workers: int):
+        pending = []
+        for op_info in op_infos:
+            loaded = self._load_operation_script(op_info)
+            if loaded is not None:
+                pending.append((op_info, *loaded))
+        if not pending:
+            return
+
+        sources = [source for _, source, _ in pending]
+        if len(pending) == 1:
+            results = [_analyze_source(sources[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+                results = list(pool.map(_analyze_source, sources, chunksize=16))
+
+        for (op_info, _, st), details in zip(pending, results):
+            self._apply_details(op_info, details, st)
+
     def _parse_cli(self) -> dict:
         """Parse cli.py to extract AVAILABLE_OPERATIONS registry."""
-        cli_path = os.path.join(self.repo_path, "service_console", "cli.py")
-        if not os.path.exists(cli_path):
-            # Try alternate paths
-            for candidate in ["cli.py", "service_console/cli.py", "src/cli.py"]:
-                full = os.path.join(self.repo_path, candidate)
-                if os.path.exists(full):
-                    cli_path = full
-                    break
-
-        if not os.path.exists(cli_path):
-            matches = []
-            for root, dirs, files in os.walk(self.repo_path):
-                if "service_console" in dirs:
-                    candidate = os.path.join(root, "service_console", "cli.py")
-                    if os.path.exists(candidate):
-                        matches.append(candidate)
-
-            if matches:
-                cli_path = sorted(matches, key=lambda p: len(p.split(os.sep)))[0]
+        default_path = os.path.join(self.repo_path, "service_console", "cli.py")
+        cli_path = _first_existing(
+            [
+                default_path,
+                # Try alternate paths
+                os.path.join(self.repo_path, "cli.py"),
+                os.path.join(self.repo_path, "src", "cli.py"),
+            ],
+            self._listings,
+        )
+
+        if cli_path is None:
+            cli_path = _find_nested_cli(self.repo_path)
+            if cli_path:
                 self.repo_path = os.path.dirname(os.path.dirname(cli_path))
 
-        if not os.path.exists(cli_path):
-            print(f"[Scanner] Warning: cli.py not found at {cli_path}")
+        if cli_path is None:
+            print(f"[Scanner] Warning: cli.py not found at {default_path}")
             return {}
 
-        with open(cli_path, "r") as f:
+        self._cli_path = os.path.abspath(cli_path)
+        with open(cli_path, "rb") as f:
             source = f.read()
 
         operations = {}
 
-        # Parse the AST to find AVAILABLE_OPERATIONS dict
+        # The AVAILABLE_OPERATIONS dict and the run command (whose click
+        # options describe the arguments) normally live at module scope, so
+        # only the top-level statements are checked. The full walk is a
+        # fallback for CLIs that define them inside a block.
+        tree = self._parse_source(self._cli_path, source)
+        registry, run_funcs = self._find_cli_nodes(tree.body)
+        if registry is None or not run_funcs:
+            walked_registry, walked_runs = self._find_cli_nodes(ast.walk(tree))
+            registry = registry or walked_registry
+            run_funcs = run_funcs or walked_runs
+        if registry is not None:
+            operations = self._extract_operations_dict(registry, source)
+
+        cli_args = self._parse_click_options(run_funcs)
+
+        # Merge CLI args into operations (later options win, as before)
+        cli_index = {cli_arg.name: cli_arg for cli_arg in cli_args}
+        for op_info in operations.values():
+            for arg in op_info.args:
+                cli_arg = cli_index.get(arg.name)
+                if cli_arg is not None:
+                    arg.arg_type = cli_arg.arg_type
+                    arg.default = cli_arg.default
+                    arg.description = cli_arg.description
+
+        return operations
+
+    def _parse_source(self, path: str, source: bytes) -> ast.Module:
+        """``ast.parse`` with an in-memory LRU keyed by ``path``.
+
+        Only the tree of a file's latest content is kept. The trees are only
+        read by the scanner, never mutated, so a cached tree can be shared
+        between scans.
+        """
+        key = hashlib.sha256(source).digest()
+        with self._ast_cache_lock:
+            cached = self._ast_cache.get(path)
+            if cached is not None and cached[0] == key:
+                self._ast_cache.move_to_end(path)
+                return cached[1]
+
         tree = ast.parse(source)
-        for node in ast.walk(tree):
+        with self._ast_cache_lock:
+            self._ast_cache[path] = (key, tree)
+            self._ast_cache.move_to_end(path)
+            while len(self._ast_cache) > _AST_MEMORY_ENTRIES:
+                self._ast_cache.popitem(last=False)
+        return tree
+
+    @staticmethod
+    def _find_cli_nodes(nodes):
+        """Return (AVAILABLE_OPERATIONS value node or None, run FunctionDefs)."""
+        registry = None
+        run_funcs = []
+        for node in nodes:
             if isinstance(node, ast.Assign):
                 for target in node.targets:
                     if isinstance(target, ast.Name) and target.id == "AVAILABLE_OPERATIONS":
-                        operations = self._extract_operations_dict(node.value, source)
-
-        # Also parse click options from the run command
-        cli_args = self._parse_click_options(tree)
-
-        # Merge CLI args into operations
-        for op_name, op_info in operations.items():
-            for arg in op_info.args:
-                # Find matching click option
-                for cli_arg in cli_args:
-                    if cli_arg.name == arg.name:
-                        arg.arg_type = cli_arg.arg_type
-                        arg.default = cli_arg.default
-                        arg.description = cli_arg.description
-
-        return operations
+                        registry = node.value
+            elif isinstance(node, ast.FunctionDef) and node.name == "run":
+                run_funcs.append(node)
+        return registry, run_funcs
 
     def _extract_operations_dict(self, node, source) -> dict:
         """Extract operation definitions from the AST Dict node."""
@@ -123,7 +436,7 @@ class RepoScanner:
             if not isinstance(key, ast.Constant):
                 continue
 
-            op_name = key.value
+            op_name = _intern(key.value)
             op_data = {"description": "", "args": [], "script": ""}
 
             if isinstance(value, ast.Dict):
@@ -132,11 +445,11 @@ class RepoScanner:
                         if k.value == "description" and isinstance(v, ast.Constant):
                             op_data["description"] = v.value
                         elif k.value == "script" and isinstance(v, ast.Constant):
-                            op_data["script"] = v.value
+                            op_data["script"] = _intern(v.value)
                         elif k.value == "args" and isinstance(v, ast.List):
                             for elt in v.elts:
                                 if isinstance(elt, ast.Constant):
-                                    arg_name = elt.value.lstrip("-").replace("-", "_")
+                                    arg_name = sys.intern(elt.value.lstrip("-").replace("-", "_"))
                                     op_data["args"].append(
                                         OperationArg(name=arg_name, required=True)
                                     )
@@ -150,96 +463,108 @@ class RepoScanner:
 
         return operations
 
-    def _parse_click_options(self, tree) -> list:
-        """Parse click.option decorators to extract CLI argument metadata."""
+    def _parse_click_options(self, run_funcs) -> list:
+        """Parse click.option decorators on the run command(s) to extract CLI argument metadata."""
         args = []
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef) and node.name == "run":
-                for decorator in node.decorator_list:
-                    if isinstance(decorator, ast.Call):
-                        func = decorator.func
-                        if isinstance(func, ast.Attribute) and func.attr == "option":
-                            if decorator.args:
-                                opt_name = None
-                                for a in decorator.args:
-                                    if isinstance(a, ast.Constant) and isinstance(a.value, str):
-                                        if a.value.startswith("--"):
-                                            opt_name = a.value.lstrip("-").replace("-", "_")
-                                            break
-
-                                if opt_name:
-                                    arg = OperationArg(name=opt_name, required=False)
-                                    for kw in decorator.keywords:
-                                        if kw.arg == "help" and isinstance(kw.value, ast.Constant):
-                                            arg.description = kw.value.value
-                                        elif kw.arg == "default" and isinstance(kw.value, ast.Constant):
-                                            arg.default = str(kw.value.value)
-                                        elif kw.arg == "type":
-                                            if isinstance(kw.value, ast.Attribute):
-                                                arg.arg_type = kw.value.attr
-                                            elif isinstance(kw.value, ast.Name):
-                                                arg.arg_type = kw.value.id
-                                        elif kw.arg == "is_flag":
-                                            arg.arg_type = "flag"
-                                    args.append(arg)
+        for node in run_funcs:
+            for decorator in node.decorator_list:
+                if isinstance(decorator, ast.Call):
+                    func = decorator.func
+                    if isinstance(func, ast.Attribute) and func.attr == "option":
+                        if decorator.args:
+                            opt_name = None
+                            for a in decorator.args:
+                                if isinstance(a, ast.Constant) and isinstance(a.value, str):
+                                    if a.value.startswith("--"):
+                                        opt_name = sys.intern(a.value.lstrip("-").replace("-", "_"))
+                                        break
+
+                            if opt_name:
+                                arg = OperationArg(name=opt_name, required=False)
+                                for kw in decorator.keywords:
+                                    if kw.arg == "help" and isinstance(kw.value, ast.Constant):
+                                        arg.description = kw.value.value
+                                    elif kw.arg == "default" and isinstance(kw.value, ast.Constant):
+                                        arg.default = str(kw.value.value)
+                                    elif kw.arg == "type":
+                                        if isinstance(kw.value, ast.Attribute):
+                                            arg.arg_type = kw.value.attr
+                                        elif isinstance(kw.value, ast.Name):
+                                            arg.arg_type = kw.value.id
+                                    elif kw.arg == "is_flag":
+                                        arg.arg_type = "flag"
+                                args.append(arg)
         return args
 
     def _parse_operation_script(self, op_info: OperationInfo):
         """Parse an individual operation script for functions, env vars, error conditions."""
-        script_path = os.path.join(self.repo_path, op_info.script_path)
-
-        # Also check under service_console/
-        if not os.path.exists(script_path):
-            alt_path = os.path.join(self.repo_path, "service_console", op_info.script_path)
-            if os.path.exists(alt_path):
-                script_path = alt_path
-
-        if not os.path.exists(script_path):
-            print(f"[Scanner] Warning: Script not found: {script_path}")
-            return
+        loaded = self._load_operation_script(op_info)
+        if loaded is not None:
+            source, st = loaded
+            tree = self._parse_source(op_info.source_file, source)
+            self._apply_details(op_info, _analyze_script(source, tree), st)
+
+    def _load_operation_script(self, op_info: OperationInfo) -> Optional[tuple]:
+        """Locate and read an operation script, applying cached results if any.
+
+        Returns ``(source, stat)`` when the script still has to be analyzed,
+        or None if it is missing or was served from the scan cache.
+        """
+        default_path = os.path.join(self.repo_path, op_info.script_path)
+        script_path = _first_existing(
+            [
+                default_path,
+                # Also check under service_console/
+                os.path.join(self.repo_path, "service_console", op_info.script_path),
+            ],
+            self._listings,
+        )
 
-        with open(script_path, "r") as f:
+        if script_path is None:
+            print(f"[Scanner] Warning: Script not found: {default_path}")
+            return None
+
+        script_path = os.path.abspath(script_path)
+        self._script_paths[op_info.name] = script_path
+        op_info.source_file = script_path
+
+        st = None
+        if self.scan_cache is not None:
+            # stat before reading, so a write racing the scan changes the
+            # recorded mtime and is re-hashed next time
+            st = os.stat(script_path)
+            cached = self.scan_cache.lookup(script_path, st)
+            if cached is not None:
+                # Unchanged since it was cached; the source is read on demand.
+                op_info.fingerprint, details = cached
+                self._apply_details(op_info, details)
+                return None
+
+        # One binary read feeds the fingerprint, ast.parse and the regexes;
+        # the text form is only decoded if something asks for source_code.
+        with open(script_path, "rb") as f:
             source = f.read()
-
-        op_info.source_code = source
-
-        # Parse AST
-        tree = ast.parse(source)
-
-        # Extract function names and docstrings
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                docstring = ast.get_docstring(node) or ""
-                op_info.functions.append({
-                    "name": node.name,
-                    "docstring": docstring,
-                    "args": [a.arg for a in node.args.args if a.arg != "self"],
-                })
-
-        # Extract environment variables (os.environ.get calls)
-        env_pattern = re.compile(r'os\.environ\.get\(["\'](\w+)["\']')
-        op_info.env_vars = env_pattern.findall(source)
-
-        # Extract error conditions (sys.exit, raise, stderr prints)
-        error_patterns = [
-            (r'print\(.*"Error:.*"', "error_print"),
-            (r"sys\.exit\((\d+)\)", "exit_code"),
-            (r'file=sys\.stderr', "stderr_output"),
-            (r'status.*error', "error_status"),
-            (r'return 1', "failure_return"),
-        ]
-
-        for pattern, error_type in error_patterns:
-            matches = re.findall(pattern, source)
-            if matches:
-                op_info.error_conditions.append({
-                    "type": error_type,
-                    "count": len(matches),
-                    "pattern": pattern,
-                })
-
-        # Extract module docstring for additional description
-        module_doc = ast.get_docstring(tree)
+        op_info.source_bytes = source
+        op_info.fingerprint = source_fingerprint(source)
+
+        if self.scan_cache is not None:
+            details = self.scan_cache.lookup_hash(script_path, op_info.fingerprint)
+            if details is not None:
+                self._apply_details(op_info, details, st)
+                return None
+        return source, st
+
+    def _apply_details(self, op_info: OperationInfo, details: dict, st=None):
+        """Fill ``op_info`` from _analyze_script output; ``st`` records it in the scan cache."""
+        if st is not None and self.scan_cache is not None:
+            self.scan_cache.store(op_info.source_file, st, op_info.fingerprint, details)
+
+        op_info.functions = list(details["functions"])
+        op_info.env_vars = list(details["env_vars"])
+        op_info.error_conditions = list(details["error_conditions"])
+
+        # Module docstring as the fallback description
+        module_doc = details["module_doc"]
         if module_doc and not op_info.description:
             op_info.description = module_doc
 
@@ -248,22 +573,26 @@ class RepoScanner:
         if not self.operations:
             return "No operations found. Run scan() first."
 
-        lines = ["=" * 60, "Service Console Repository Scan Summary", "=" * 60]
+        rule = "=" * 60
+        blocks = [rule, "Service Console Repository Scan Summary", rule]
         for name, op in self.operations.items():
-            lines.append(f"\nOperation: {name}")
-            lines.append(f"  Description: {op.description}")
-            lines.append(f"  Script: {op.script_path}")
-            lines.append(f"  Args: {[a.name for a in op.args]}")
-            lines.append(f"  Env Vars: {op.env_vars}")
-            lines.append(f"  Functions: {[f['name'] for f in op.functions]}")
-            lines.append(f"  Error Conditions: {len(op.error_conditions)}")
-        lines.append("=" * 60)
-        return "\n".join(lines)
+            arg_names = [a.name for a in op.args]
+            function_names = [f["name"] for f in op.functions]
+            blocks.append(
+                f"\nOperation: {name}\n"
+                f"  Description: {op.description}\n"
+                f"  Script: {op.script_path}\n"
+                f"  Args: {arg_names}\n"
+                f"  Env Vars: {op.env_vars}\n"
+                f"  Functions: {function_names}\n"
+                f"  Error Conditions: {len(op.error_conditions)}"
+            )
+        blocks.append(rule)
+        return "\n".join(blocks)
 
     def to_json(self) -> str:
         """Export scan results as JSON for LLM consumption."""
-        return json.dumps(
+        return dumps_pretty(
             {name: op.to_dict() for name, op in self.operations.items()},
-            indent=2,
             default=str,
         )
@@ -4,10 +4,10 @@ Used as a fallback when no LLM API key is available, and also as a
 baseline that the LLM can improve upon.
 """
 
-from jinja2 import Template
+from functools import cache, lru_cache
 
 
-ROBOT_TEMPLATE = Template("""*** Settings ***
+ROBOT_TEMPLATE_SOURCE = """*** Settings ***
 Documentation     Test suite for {{ op_name }} operation
 Library           Process
 Library           OperatingSystem
@@ -19,7 +19,7 @@ Suite Teardown    Cleanup Test Artifacts
 ${SERVICE_CONSOLE}    service-console
 ${TIMEOUT}            120
 {% for arg in args %}
-${DEFAULT_{{ arg.name | upper }}}    {{ arg.default or 'test-value' }}
+${DEFAULT_{{ arg.upper_name }}}    {{ arg.default or 'test-value' }}
 {% endfor %}
 
 *** Test Cases ***
@@ -29,29 +29,29 @@ ${DEFAULT_{{ arg.name | upper }}}    {{ arg.default or 'test-value' }}
 
 {{ op_name }} Smoke Test
     [Documentation]    Verify {{ op_name }} operation runs successfully with valid arguments
-    [Tags]    smoke    positive    {{ op_name | lower }}
-    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}{% for arg in required_args %}    --{{ arg.name | replace('_', '-') }}    ${DEFAULT_{{ arg.name | upper }}}{% endfor %}    --dry-run
+    [Tags]    smoke    positive    {{ op_name_lower }}
+    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}{{ required_cli_args }}    --dry-run
     Should Be Equal As Integers    ${result.rc}    0
     Should Contain    ${result.stdout}    {{ op_name }}
 
 {{ op_name }} With Dry Run Flag
     [Documentation]    Verify {{ op_name }} operation works with --dry-run flag
-    [Tags]    positive    dry_run    {{ op_name | lower }}
-    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}{% for arg in required_args %}    --{{ arg.name | replace('_', '-') }}    ${DEFAULT_{{ arg.name | upper }}}{% endfor %}    --dry-run
+    [Tags]    positive    dry_run    {{ op_name_lower }}
+    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}{{ required_cli_args }}    --dry-run
     Should Be Equal As Integers    ${result.rc}    0
     Should Contain    ${result.stdout}    DRY RUN
 
 {{ op_name }} With Custom Timeout
     [Documentation]    Verify {{ op_name }} operation accepts custom timeout
-    [Tags]    positive    {{ op_name | lower }}
-    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}{% for arg in required_args %}    --{{ arg.name | replace('_', '-') }}    ${DEFAULT_{{ arg.name | upper }}}{% endfor %}    --timeout    60    --dry-run
+    [Tags]    positive    {{ op_name_lower }}
+    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}{{ required_cli_args }}    --timeout    60    --dry-run
     Should Be Equal As Integers    ${result.rc}    0
 
 {% for arg in optional_args %}
 {{ op_name }} With Optional Arg {{ arg.name }}
-    [Documentation]    Verify {{ op_name }} works with optional argument --{{ arg.name | replace('_', '-') }}
-    [Tags]    positive    {{ op_name | lower }}
-    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}{% for ra in required_args %}    --{{ ra.name | replace('_', '-') }}    ${DEFAULT_{{ ra.name | upper }}}{% endfor %}    --{{ arg.name | replace('_', '-') }}    {{ arg.default or 'test-value' }}    --dry-run
+    [Documentation]    Verify {{ op_name }} works with optional argument --{{ arg.cli_name }}
+    [Tags]    positive    {{ op_name_lower }}
+    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}{{ required_cli_args }}    --{{ arg.cli_name }}    {{ arg.default or 'test-value' }}    --dry-run
     Should Be Equal As Integers    ${result.rc}    0
 
 {% endfor %}
@@ -61,45 +61,45 @@ ${DEFAULT_{{ arg.name | upper }}}    {{ arg.default or 'test-value' }}
 
 {% for arg in required_args %}
 {{ op_name }} Fails Without Required Arg {{ arg.name }}
-    [Documentation]    Verify {{ op_name }} fails when required argument --{{ arg.name | replace('_', '-') }} is missing
-    [Tags]    negative    {{ op_name | lower }}
-    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}{% for other in required_args if other.name != arg.name %}    --{{ other.name | replace('_', '-') }}    ${DEFAULT_{{ other.name | upper }}}{% endfor %}
+    [Documentation]    Verify {{ op_name }} fails when required argument --{{ arg.cli_name }} is missing
+    [Tags]    negative    {{ op_name_lower }}
+    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}{{ arg.other_required_cli_args }}
     Should Not Be Equal As Integers    ${result.rc}    0
     Should Contain    ${result.stderr}    Error
 
 {% endfor %}
 {{ op_name }} Fails With Unknown Operation Name
     [Documentation]    Verify service-console rejects unknown operation names
-    [Tags]    negative    {{ op_name | lower }}
+    [Tags]    negative    {{ op_name_lower }}
     ${result}=    Run Process    ${SERVICE_CONSOLE}    run    Invalid_Operation_XYZ
     Should Not Be Equal As Integers    ${result.rc}    0
     Should Contain    ${result.stderr}    Unknown operation
 
 {{ op_name }} Fails With Empty Operation Name
     [Documentation]    Verify service-console handles empty operation name
-    [Tags]    negative    edge_case    {{ op_name | lower }}
+    [Tags]    negative    edge_case    {{ op_name_lower }}
     ${result}=    Run Process    ${SERVICE_CONSOLE}    run
     Should Not Be Equal As Integers    ${result.rc}    0
 
 {% for arg in required_args %}
 {{ op_name }} Fails With Empty Value For {{ arg.name }}
-    [Documentation]    Verify {{ op_name }} rejects empty value for --{{ arg.name | replace('_', '-') }}
-    [Tags]    negative    edge_case    {{ op_name | lower }}
-    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}    --{{ arg.name | replace('_', '-') }}    ${EMPTY}
+    [Documentation]    Verify {{ op_name }} rejects empty value for --{{ arg.cli_name }}
+    [Tags]    negative    edge_case    {{ op_name_lower }}
+    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}    --{{ arg.cli_name }}    ${EMPTY}
     Should Not Be Equal As Integers    ${result.rc}    0
 
 {% endfor %}
 {% for arg in args if arg.arg_type == 'int' %}
 {{ op_name }} Fails With Non Numeric {{ arg.name }}
-    [Documentation]    Verify {{ op_name }} rejects non-numeric value for --{{ arg.name | replace('_', '-') }}
-    [Tags]    negative    {{ op_name | lower }}
-    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}{% for ra in required_args %}    --{{ ra.name | replace('_', '-') }}    ${DEFAULT_{{ ra.name | upper }}}{% endfor %}    --{{ arg.name | replace('_', '-') }}    not_a_number
+    [Documentation]    Verify {{ op_name }} rejects non-numeric value for --{{ arg.cli_name }}
+    [Tags]    negative    {{ op_name_lower }}
+    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}{{ required_cli_args }}    --{{ arg.cli_name }}    not_a_number
     Should Not Be Equal As Integers    ${result.rc}    0
 
 {{ op_name }} Fails With Negative {{ arg.name }}
-    [Documentation]    Verify {{ op_name }} rejects negative value for --{{ arg.name | replace('_', '-') }}
-    [Tags]    negative    edge_case    {{ op_name | lower }}
-    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}{% for ra in required_args %}    --{{ ra.name | replace('_', '-') }}    ${DEFAULT_{{ ra.name | upper }}}{% endfor %}    --{{ arg.name | replace('_', '-') }}    -1
+    [Documentation]    Verify {{ op_name }} rejects negative value for --{{ arg.cli_name }}
+    [Tags]    negative    edge_case    {{ op_name_lower }}
+    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}{{ required_cli_args }}    --{{ arg.cli_name }}    -1
     Should Not Be Equal As Integers    ${result.rc}    0
 
 {% endfor %}
@@ -109,16 +109,16 @@ ${DEFAULT_{{ arg.name | upper }}}    {{ arg.default or 'test-value' }}
 
 {% for arg in required_args %}
 {{ op_name }} With Special Characters In {{ arg.name }}
-    [Documentation]    Verify {{ op_name }} handles special characters in --{{ arg.name | replace('_', '-') }}
-    [Tags]    edge_case    {{ op_name | lower }}
-    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}    --{{ arg.name | replace('_', '-') }}    t€st!@#$%
+    [Documentation]    Verify {{ op_name }} handles special characters in --{{ arg.cli_name }}
+    [Tags]    edge_case    {{ op_name_lower }}
+    ${result}=    Run Process    ${SERVICE_CONSOLE}    run    {{ op_name }}    --{{ arg.cli_name }}    t€st!@#$%
     # Should either succeed or fail gracefully (no crash)
     Should Be True    ${result.rc} >= 0
 
 {% endfor %}
 {{ op_name }} Help Flag
     [Documentation]    Verify --help flag works for the run command
-    [Tags]    positive    {{ op_name | lower }}
+    [Tags]    positive    {{ op_name_lower }}
     ${result}=    Run Process    ${SERVICE_CONSOLE}    run    --help
     Should Be Equal As Integers    ${result.rc}    0
     Should Contain    ${result.stdout}    {{ op_name }}
@@ -133,41 +133,101 @@ Verify Service Console Is Available
 Cleanup Test Artifacts
     [Documentation]    Clean up any test artifacts created during the test run
     Log    Cleanup complete
-""")
+"""
+
+
+@cache
+def _robot_template():
+    """Compile ROBOT_TEMPLATE_SOURCE on first use.
+
+    Importing this module (e.g. for the scanner or watcher) then costs
+    neither the jinja2 import nor the template compile.
+    """
+    from jinja2 import Template
+
+    return Template(ROBOT_TEMPLATE_SOURCE)
+
+
+def precompile_templates() -> None:
+    """Import jinja2 and compile the test template now rather than on the
+    first generate() call."""
+    _robot_template()
+
+
+_ARG_FIELDS = ("name", "required", "arg_type", "default")
+
+
+def _normalize_arg(a) -> dict:
+    """Normalize an argument (dict or dataclass-like object) to a dict."""
+    if isinstance(a, dict):
+        return a
+    # Handle dataclass-like objects
+    return {
+        "name": getattr(a, "name", str(a)),
+        "required": getattr(a, "required", False),
+        "arg_type": getattr(a, "arg_type", "string"),
+        "default": getattr(a, "default", None),
+        "description": getattr(a, "description", ""),
+    }
+
+
+def _args_key(args: list) -> tuple:
+    """Hashable signature of the argument fields the template reads."""
+    key = []
+    for a in args:
+        n = _normalize_arg(a)
+        key.append((n.get("name", ""), n.get("required", False), n.get("arg_type"), n.get("default")))
+    return tuple(key)
+
+
+@lru_cache(maxsize=256)
+def _render(op_name: str, args_key: tuple) -> str:
+    # Build and classify the args in a single pass
+    args, required_args, optional_args = [], [], []
+    for values in args_key:
+        n = dict(zip(_ARG_FIELDS, values))
+        name = str(n["name"])
+        n["cli_name"] = name.replace("_", "-")
+        n["upper_name"] = name.upper()
+        args.append(n)
+        (required_args if n["required"] else optional_args).append(n)
+
+    # The "--arg ${DEFAULT_ARG}" list of required args repeats in most test
+    # cases, so it is built once here rather than looped over in the template.
+    required_cli = [
+        (a["name"], f"    --{a['cli_name']}    ${{DEFAULT_{a['upper_name']}}}")
+        for a in required_args
+    ]
+    for a in required_args:
+        a["other_required_cli_args"] = "".join(
+            cli for name, cli in required_cli if name != a["name"]
+        )
+
+    return _robot_template().render(
+        op_name=op_name,
+        op_name_lower=str(op_name).lower(),
+        args=args,
+        required_args=required_args,
+        optional_args=optional_args,
+        required_cli_args="".join(cli for _, cli in required_cli),
+    )
 
 
 class TemplateGenerator:
     """Generates Robot Framework tests from templates using operation metadata."""
 
     def generate(self, operation_info: dict) -> str:
-        """Generate a Robot Framework test file from operation info dict."""
+        """Generate a Robot Framework test file from operation info dict.
+
+        Rendering is memoized on the operation name and argument signature,
+        so regenerating an unchanged operation skips the template.
+        """
         op_name = operation_info.get("name", "Unknown")
         args = operation_info.get("args", [])
 
-        # Classify args
-        required_args = [a for a in args if a.get("required", False) or (isinstance(a, dict) and a.get("required", False))]
-        optional_args = [a for a in args if not (a.get("required", False) if isinstance(a, dict) else False)]
-
-        # Normalize args to dicts
-        def normalize_arg(a):
-            if isinstance(a, dict):
-                return a
-            # Handle dataclass-like objects
-            return {
-                "name": getattr(a, "name", str(a)),
-                "required": getattr(a, "required", False),
-                "arg_type": getattr(a, "arg_type", "string"),
-                "default": getattr(a, "default", None),
-                "description": getattr(a, "description", ""),
-            }
-
-        args_normalized = [normalize_arg(a) for a in args]
-        required_normalized = [normalize_arg(a) for a in required_args]
-        optional_normalized = [normalize_arg(a) for a in optional_args]
-
-        return ROBOT_TEMPLATE.render(
-            op_name=op_name,
-            args=args_normalized,
-            required_args=required_normalized,
-            optional_args=optional_normalized,
-        )
+        key = _args_key(args)
+        try:
+            return _render(op_name, key)
+        except TypeError:
+            # Unhashable default value; render without the cache.
+            return _render.__wrapped__(op_name, key)
@@ -3,28 +3,82 @@ File Watcher - Monitors the service-console repo for changes and
 automatically triggers test regeneration when new operations are added.
 """
 
+import asyncio
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 from rich.console import Console
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
-from agent.orchestrator import TestAutomationAgent
-from agent.git_repo import clone_or_update_repo, get_remote_head_sha, is_git_url, pull_repo
+from agent.fsutil import default_cache_root
+from agent.orchestrator import GenerationStopped, TestAutomationAgent
+from agent.orchestrator_mock import MockTestAutomationAgent
+from agent.git_repo import (
+    clone_or_update_repo,
+    get_local_head_sha,
+    get_remote_head_sha,
+    get_tracked_branch,
+    is_git_url,
+)
 
 console = Console()
 
+# Idle remote polls back off by this factor, up to the cap.
+_POLL_BACKOFF = 1.5
+_MAX_POLL_SECONDS = 15 * 60
+# Bound on extra ls-remote probes while waiting for a push burst to settle.
+_MAX_SETTLE_PROBES = 10
+
+
+def _snapshot(agent: TestAutomationAgent) -> dict:
+    """Reduce the agent's scan results to what scan_for_changes compares.
+
+    Template fallbacks get an empty generation key, so the next change
+    retries them.
+    """
+    fallbacks = agent.fallback_operations
+    return {
+        name: {
+            "fingerprint": op.fingerprint,
+            "generation_key": "" if name in fallbacks else agent.generation_key(op),
+        }
+        for name, op in agent.scan_results.items()
+    }
 
-class OperationChangeHandler(FileSystemEventHandler):
-    """Handles file system events in the service-console repo."""
 
-    def __init__(self, agent: TestAutomationAgent, debounce_seconds: float = 2.0):
+class OperationChangeHandler(FileSystemEventHandler):
+    """Handles file system events in the service-console repo.
+
+    Events are coalesced: watchdog threads only add the changed path to a
+    pending set and mark the handler dirty. ``run_forever`` is the single
+    consumer; once no event has arrived for ``debounce_seconds`` it rescans
+    the whole batch, so a burst of saves or a ``git pull`` -- or
+    changes arriving while a regeneration is in flight -- produce one run.
+    """
+
+    # Directories whose contents never affect the scan
+    _IGNORED_SEGMENTS = frozenset({
+        ".git", "__pycache__", ".pytest_cache", ".venv", "venv",
+        "node_modules", ".mypy_cache", ".tox",
+    })
+
+    def __init__(
+        self,
+        agent: TestAutomationAgent,
+        loop: asyncio.AbstractEventLoop,
+        debounce_seconds: float = 2.0,
+    ):
         super().__init__()
         self.agent = agent
         self.debounce_seconds = debounce_seconds
-        self._last_event_time = 0
+        self._loop = loop
+        self._dirty = asyncio.Event()
+        self._pending = set()
+        self._lock = threading.Lock()
         self._previous_scan = None
 
     def on_modified(self, event):
@@ -37,26 +91,63 @@ class OperationChangeHandler(FileSystemEventHandler):
         if event.is_directory:
             return
 
-        if not event.src_path.endswith(".py"):
-            return
-
-        now = time.time()
-        if now - self._last_event_time < self.debounce_seconds:
+        if not event.src_path.endswith(".py") or not self._is_relevant(event.src_path):
             return
 
-        self._last_event_time = now
-        rel_path = os.path.relpath(event.src_path, self.agent.service_console_repo)
-        console.print(f"\n[yellow]📁 Change detected: {rel_path}[/yellow]")
+        with self._lock:
+            self._pending.add(event.src_path)
+        self._loop.call_soon_threadsafe(self._dirty.set)
+
+    def _is_relevant(self, path: str) -> bool:
+        """True if a change to ``path`` could alter the scan results."""
+        path = os.path.abspath(path)
+        base = os.path.basename(path)
+        if base.startswith(".") or base.endswith("~"):
+            # Editor swap/backup files
+            return False
+
+        output_dir = str(self.agent.output_dir)
+        if path == output_dir or path.startswith(output_dir + os.sep):
+            return False
+
+        # The scanner may have narrowed repo_path to a nested service console
+        repo_root = os.path.abspath(self.agent.scanner.repo_path)
+        rel_path = os.path.relpath(path, repo_root)
+        if rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep):
+            return False
+        return self._IGNORED_SEGMENTS.isdisjoint(rel_path.split(os.sep))
+
+    def cancel(self):
+        """Drop any pending batch."""
+        with self._lock:
+            self._pending.clear()
+        self._dirty.clear()
+
+    async def run_forever(self, executor: ThreadPoolExecutor):
+        """Process pending changes one batch at a time on ``executor``."""
+        while True:
+            await self._dirty.wait()
+            # Quiet period: every event during the sleep restarts it, so a
+            # burst of any length is handled once it has settled.
+            while self._dirty.is_set():
+                self._dirty.clear()
+                await asyncio.sleep(self.debounce_seconds)
+            with self._lock:
+                changed = self._pending
+                self._pending = set()
+            if changed:
+                await self._loop.run_in_executor(executor, self._process, changed)
+
+    def _process(self, changed: set):
+        rel_paths = sorted(
+            os.path.relpath(path, self.agent.service_console_repo) for path in changed
+        )
+        console.print(f"\n[yellow]📁 Change detected: {', '.join(rel_paths)}[/yellow]")
 
         try:
-            prev = {}
-            if self._previous_scan:
-                prev = {
-                    name: {"source_code": op.source_code}
-                    for name, op in self._previous_scan.items()
-                }
+            prev = self._previous_scan or {}
 
-            changed_ops = self.agent.scan_for_changes(prev)
+            changed_ops = self.agent.scan_for_changes(prev, changed_paths=changed)
 
             if changed_ops:
                 console.print(f"[cyan]Regenerating tests for: {', '.join(changed_ops)}[/cyan]")
@@ -65,12 +156,37 @@ class OperationChangeHandler(FileSystemEventHandler):
             else:
                 console.print("[dim]No operation changes detected[/dim]")
 
-            self._previous_scan = dict(self.agent.scan_results)
+            self._previous_scan = _snapshot(self.agent)
 
+        except GenerationStopped:
+            # The watcher is shutting down.
+            pass
         except Exception as e:
             console.print(f"[red]Error processing change: {e}[/red]")
 
 
+def _settle_remote_sha(
+    repo_url: str, cache_root: str, ref: str, sha: str, debounce_seconds: float
+) -> str:
+    """Re-probe the remote until it stops moving and return the newest SHA.
+
+    A burst of pushes then costs one update and regeneration, against the
+    last commit, instead of one per poll that happens to see a new SHA.
+    """
+    for _ in range(_MAX_SETTLE_PROBES):
+        if debounce_seconds <= 0:
+            break
+        time.sleep(debounce_seconds)
+        try:
+            newest = get_remote_head_sha(repo_url, cache_root=cache_root, ttl=0, ref=ref)
+        except Exception:
+            break
+        if not newest or newest == sha:
+            break
+        sha = newest
+    return sha
+
+
 def watch_repo(
     service_console_repo: str,
     output_dir: str,
@@ -79,97 +195,192 @@ def watch_repo(
     model: str = "gpt-4o",
     use_mock: bool = False,
     poll_seconds: float = 60,
+    debounce_ms: float = 300,
+    llm_cache_dir: Optional[str] = None,
+    use_llm_cache: bool = True,
+    http_client=None,
 ):
-    """Start watching the service-console repo for changes."""
-    if is_git_url(service_console_repo):
-        cache_root = os.path.join(os.path.expanduser("~"), ".cache", "test-automation-agent")
-        local_repo = clone_or_update_repo(repo_url=service_console_repo, cache_root=cache_root)
-        is_remote = True
-    elif os.path.isdir(service_console_repo):
-        local_repo = service_console_repo
-        is_remote = False
-    else:
-        raise ValueError(f"service_console_repo must be a local directory or git URL. Got: {service_console_repo}")
-
-    agent = TestAutomationAgent(
-        service_console_repo=local_repo,
-        output_dir=output_dir,
-        api_key=api_key,
-        base_url=base_url,
-        model=model,
-        use_mock=use_mock,
-    )
-
-    # Initial run
-    console.print("[bold]Running initial scan and test generation...[/bold]")
-    agent.run()
-
-    if not is_remote:
-        handler = OperationChangeHandler(agent)
-        handler._previous_scan = dict(agent.scan_results)
-
-        observer = Observer()
-        observer.schedule(handler, agent.service_console_repo, recursive=True)
-        observer.start()
-
-        console.print(f"\n[bold green]👀 Watching for changes in: {agent.service_console_repo}[/bold green]")
-        console.print("[dim]Press Ctrl+C to stop[/dim]\n")
+    """Blocking wrapper around :func:`watch_repo_async`; returns on Ctrl+C."""
+    try:
+        asyncio.run(watch_repo_async(
+            service_console_repo,
+            output_dir,
+            api_key=api_key,
+            base_url=base_url,
+            model=model,
+            use_mock=use_mock,
+            poll_seconds=poll_seconds,
+            debounce_ms=debounce_ms,
+            llm_cache_dir=llm_cache_dir,
+            use_llm_cache=use_llm_cache,
+            http_client=http_client,
+        ))
+    except KeyboardInterrupt:
+        pass
 
-        try:
-            while True:
-                time.sleep(1)
-        except KeyboardInterrupt:
-            observer.stop()
-            console.print("\n[yellow]Watcher stopped[/yellow]")
 
+async def watch_repo_async(
+    service_console_repo: str,
+    output_dir: str,
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+    model: str = "gpt-4o",
+    use_mock: bool = False,
+    poll_seconds: float = 60,
+    debounce_ms: float = 300,
+    llm_cache_dir: Optional[str] = None,
+    use_llm_cache: bool = True,
+    http_client=None,
+):
+    """Watch the service-console repo for changes until cancelled.
+
+    File events (local repos) and new commits (remote repos) that arrive
+    within ``debounce_ms`` of each other are handled as one regeneration.
+    The agent itself is blocking, so all scanning and generation runs on a
+    single worker thread: at most one regeneration is in flight and the
+    event loop stays free to collect changes meanwhile.
+    """
+    debounce_seconds = max(debounce_ms, 0) / 1000
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="watch-agent")
+
+    def in_worker(func, *args, **kwargs):
+        return loop.run_in_executor(executor, lambda: func(*args, **kwargs))
+
+    agent = None
+    try:
+        if is_git_url(service_console_repo):
+            cache_root = default_cache_root()
+            local_repo = await in_worker(
+                clone_or_update_repo, repo_url=service_console_repo, cache_root=cache_root
+            )
+            is_remote = True
+        elif os.path.isdir(service_console_repo):
+            local_repo = service_console_repo
+            is_remote = False
+        else:
+            raise ValueError(f"service_console_repo must be a local directory or git URL. Got: {service_console_repo}")
+
+        agent_cls = MockTestAutomationAgent if use_mock else TestAutomationAgent
+        agent = agent_cls(
+            service_console_repo=local_repo,
+            output_dir=output_dir,
+            api_key=api_key,
+            base_url=base_url,
+            model=model,
+            use_mock=use_mock,
+            llm_cache_dir=llm_cache_dir,
+            use_llm_cache=use_llm_cache,
+            http_client=http_client,
+        )
+
+        # Initial run
+        console.print("[bold]Running initial scan and test generation...[/bold]")
+        await in_worker(agent.run)
+
+        if is_remote:
+            await _poll_remote(
+                agent, service_console_repo, cache_root, local_repo,
+                poll_seconds, debounce_seconds, in_worker,
+            )
+        else:
+            await _watch_local(agent, loop, debounce_seconds, executor)
+    except asyncio.CancelledError:
+        console.print("\n[yellow]Watcher stopped[/yellow]")
+        raise
+    finally:
+        if agent is not None:
+            # Abort any regeneration on the worker thread, so the close
+            # queued behind it (and the process exit) doesn't wait for the LLM.
+            agent.request_stop()
+            executor.submit(agent.close)
+        executor.shutdown(wait=False)
+
+
+async def _watch_local(agent, loop, debounce_seconds: float, executor: ThreadPoolExecutor):
+    handler = OperationChangeHandler(agent, loop, debounce_seconds=debounce_seconds)
+    handler._previous_scan = _snapshot(agent)
+
+    observer = Observer()
+    observer.schedule(handler, agent.service_console_repo, recursive=True)
+    observer.start()
+
+    console.print(f"\n[bold green]👀 Watching for changes in: {agent.service_console_repo}[/bold green]")
+    console.print("[dim]Press Ctrl+C to stop[/dim]\n")
+
+    try:
+        await handler.run_forever(executor)
+    finally:
+        observer.stop()
+        handler.cancel()
         observer.join()
-        return
 
-    prev_scan = {
-        name: {"source_code": op.source_code}
-        for name, op in agent.scan_results.items()
-    }
+
+async def _poll_remote(
+    agent, repo_url: str, cache_root: str, local_repo: str,
+    poll_seconds: float, debounce_seconds: float, in_worker,
+):
+    prev_scan = _snapshot(agent)
 
     last_remote_sha = ""
+    last_local_sha = get_local_head_sha(local_repo)
+    # Poll just the branch the checkout tracks; fall back to the remote HEAD.
+    tracked_ref = get_tracked_branch(local_repo) or "HEAD"
     try:
-        last_remote_sha = get_remote_head_sha(service_console_repo)
+        last_remote_sha = await in_worker(
+            get_remote_head_sha, repo_url, cache_root=cache_root, ttl=0, ref=tracked_ref
+        )
     except Exception as e:
         console.print(f"[yellow]Unable to read remote HEAD: {e}[/yellow]")
 
-    console.print(f"\n[bold green]👀 Watching remote repo for changes: {service_console_repo}[/bold green]")
+    console.print(f"\n[bold green]👀 Watching remote repo for changes: {repo_url}[/bold green]")
     console.print("[dim]Press Ctrl+C to stop[/dim]\n")
 
-    try:
-        while True:
-            time.sleep(max(poll_seconds, 1))
-            try:
-                remote_sha = get_remote_head_sha(service_console_repo)
-            except Exception as e:
-                console.print(f"[yellow]Unable to read remote HEAD: {e}[/yellow]")
-                continue
-
-            if remote_sha and remote_sha != last_remote_sha:
-                console.print(f"\n[cyan]New commit detected: {remote_sha}[/cyan]")
-                try:
-                    pull_repo(local_repo)
-                except Exception as e:
-                    console.print(f"[red]Failed to pull latest changes: {e}[/red]")
-                    last_remote_sha = remote_sha
-                    continue
-
-                changed_ops = agent.scan_for_changes(prev_scan)
-                if changed_ops:
-                    console.print(f"[cyan]Regenerating tests for: {', '.join(changed_ops)}[/cyan]")
-                    agent.generate_for_operations(changed_ops)
-                    console.print("[green]✓ Tests updated[/green]")
-                else:
-                    console.print("[dim]No operation changes detected[/dim]")
-
-                prev_scan = {
-                    name: {"source_code": op.source_code}
-                    for name, op in agent.scan_results.items()
-                }
-                last_remote_sha = remote_sha
+    poll_seconds = max(poll_seconds, 1)
+    interval = poll_seconds
+    while True:
+        await asyncio.sleep(interval)
+        # Back off while the remote is idle; a new commit resets this.
+        interval = max(poll_seconds, min(interval * _POLL_BACKOFF, _MAX_POLL_SECONDS))
+        try:
+            remote_sha = await in_worker(
+                get_remote_head_sha, repo_url, cache_root=cache_root, ttl=0, ref=tracked_ref
+            )
+        except Exception as e:
+            console.print(f"[yellow]Unable to read remote HEAD: {e}[/yellow]")
+            continue
 
-    except KeyboardInterrupt:
-        console.print("\n[yellow]Watcher stopped[/yellow]")
+        if not remote_sha or remote_sha == last_remote_sha:
+            continue
+
+        interval = poll_seconds
+        remote_sha = await in_worker(
+            _settle_remote_sha, repo_url, cache_root, tracked_ref, remote_sha, debounce_seconds
+        )
+        console.print(f"\n[cyan]New commit detected: {remote_sha}[/cyan]")
+        try:
+            await in_worker(
+                clone_or_update_repo, repo_url=repo_url, cache_root=cache_root, fetch_ttl=0
+            )
+        except Exception as e:
+            console.print(f"[red]Failed to update local checkout: {e}[/red]")
+            last_remote_sha = remote_sha
+            continue
+
+        local_sha = get_local_head_sha(local_repo)
+        if local_sha == last_local_sha:
+            console.print("[dim]Local checkout unchanged after update[/dim]")
+            last_remote_sha = remote_sha
+            continue
+        last_local_sha = local_sha
+
+        changed_ops = await in_worker(agent.scan_for_changes, prev_scan)
+        if changed_ops:
+            console.print(f"[cyan]Regenerating tests for: {', '.join(changed_ops)}[/cyan]")
+            await in_worker(agent.generate_for_operations, changed_ops)
+            console.print("[green]✓ Tests updated[/green]")
+        else:
+            console.print("[dim]No operation changes detected[/dim]")
+
+        prev_scan = _snapshot(agent)
+        last_remote_sha = remote_sha
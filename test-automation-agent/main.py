@@ -16,99 +16,205 @@ Usage:
 
     # Use template-based generation (no LLM needed)
     python main.py generate --repo ../service-console --output ./generated_tests --mock
+
+    # Keep the checkout, scan and LLM caches in memory (tmpfs)
+    XDG_CACHE_HOME=/dev/shm/cache python main.py generate --repo https://github.com/org/service-console.git
 """
 
+import argparse
 import os
 import sys
-import click
+import time
 
-from agent.orchestrator import TestAutomationAgent
-from agent.watcher import watch_repo
-from agent.git_repo import clone_or_update_repo, is_git_url
+# Agent modules are imported inside each command so --help, --version and
+# scan don't pay for openai, watchdog, rich and jinja2 up front; --mock runs
+# never import openai at all.
 
+VERSION = "1.0.0"
 
-@click.group()
-@click.version_option(version="1.0.0")
-def cli():
-    """Test Automation Agent - Auto-generate Robot Framework tests for service-console operations."""
-    pass
+# Written to the output directory by generate.
+SUMMARY_FILENAME = "_summary.json"
 
 
-@cli.command()
-@click.option("--repo", "-r", required=True, help="Path or git URL to the service-console repository")
-@click.option("--output", "-o", default="./generated_tests", help="Output directory for generated tests")
-@click.option("--api-key", "-k", default=None, help="OpenAI API key (or set OPENAI_API_KEY env var)")
-@click.option("--base-url", "-u", default=None, help="Custom LLM API base URL (for Ollama, LM Studio, etc.)")
-@click.option("--model", "-m", default="gpt-4o", help="LLM model to use")
-@click.option("--mock", is_flag=True, help="Use template-based generation (no LLM API needed)")
-def generate(repo, output, api_key, base_url, model, mock):
-    """Scan the service-console repo and generate Robot Framework tests."""
+def _start_resolving_repo(repo: str):
+    """Start getting a local checkout for ``repo`` and return its Future.
+
+    A git URL is cloned or updated in the cache on a background thread, so
+    the caller can set up meanwhile; a directory is used as is. Anything
+    else exits with an error.
+    """
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+    from agent.fsutil import default_cache_root
+    from agent.git_repo import clone_or_update_repo, is_git_url
+
     if is_git_url(repo):
-        cache_root = os.path.join(os.path.expanduser("~"), ".cache", "test-automation-agent")
-        local_repo = clone_or_update_repo(repo_url=repo, cache_root=cache_root)
-    elif os.path.isdir(repo):
-        local_repo = repo
-    else:
-        click.echo(f"Error: --repo must be a local directory or git URL. Got: {repo}", err=True)
-        sys.exit(1)
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clone")
+        future = pool.submit(clone_or_update_repo, repo_url=repo, cache_root=default_cache_root())
+        pool.shutdown(wait=False)
+        return future
+    if os.path.isdir(repo):
+        future = Future()
+        future.set_result(repo)
+        return future
+    print(f"Error: --repo must be a local directory or git URL. Got: {repo}", file=sys.stderr)
+    sys.exit(1)
 
-    agent = TestAutomationAgent(
-        service_console_repo=local_repo,
-        output_dir=output,
-        api_key=api_key,
-        base_url=base_url,
-        model=model,
-        use_mock=mock,
-    )
 
-    results = agent.run()
+def _resolve_repo(repo: str) -> str:
+    """Blocking form of :func:`_start_resolving_repo`."""
+    return _start_resolving_repo(repo).result()
 
-    if not results:
-        click.echo("Warning: No tests were generated.", err=True)
+
+def generate(args):
+    """Scan the service-console repo and generate Robot Framework tests."""
+    # Clone/update on a background thread while the agent modules are
+    # imported and the agent and its LLM client are set up.
+    checkout = _start_resolving_repo(args.repo)
+
+    from agent.fsutil import atomic_write_bytes
+    from agent.jsonutil import dumps_pretty_bytes
+    from agent.llm_client import build_http_client
+    from agent.scan_cache import ScanCache
+
+    if args.mock:
+        from agent.orchestrator_mock import MockTestAutomationAgent as Agent
+    else:
+        from agent.orchestrator import TestAutomationAgent as Agent
+
+    agent = Agent(
+        service_console_repo=None,
+        output_dir=args.output,
+        api_key=args.api_key,
+        base_url=args.base_url,
+        model=args.model,
+        use_mock=args.mock,
+        scan_cache=ScanCache(),
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        llm_cache_dir=args.cache_dir,
+        use_llm_cache=not args.no_cache,
+        resume=args.resume,
+        force=args.force,
+        http_client=None if args.mock else build_http_client(),
+    )
+
+    files = []
+    try:
+        agent.bind_repo(checkout.result())
+        started = time.monotonic()
+        for _, path in agent.run_iter():
+            files.append(str(path))
+    finally:
+        agent.close()
+    count = len(files)
+
+    # Machine-readable counterpart of the messages below, for CI wrappers.
+    summary = {
+        "count": count,
+        "files": files,
+        "duration_s": round(time.monotonic() - started, 3),
+        "cache_hits": agent.cache_hits,
+        "llm_tokens": agent.llm_tokens,
+    }
+    atomic_write_bytes(os.path.join(args.output, SUMMARY_FILENAME), dumps_pretty_bytes(summary))
+
+    if not count:
+        print("Warning: No tests were generated.", file=sys.stderr)
         sys.exit(1)
 
-    click.echo(f"\nGenerated {len(results)} test files in: {os.path.abspath(output)}")
+    print(f"\nGenerated {count} test files in: {os.path.abspath(args.output)}")
 
 
-@cli.command()
-@click.option("--repo", "-r", required=True, help="Path or git URL to the service-console repository")
-@click.option("--output", "-o", default="./generated_tests", help="Output directory for generated tests")
-@click.option("--api-key", "-k", default=None, help="OpenAI API key (or set OPENAI_API_KEY env var)")
-@click.option("--base-url", "-u", default=None, help="Custom LLM API base URL")
-@click.option("--model", "-m", default="gpt-4o", help="LLM model to use")
-@click.option("--mock", is_flag=True, help="Use template-based generation (no LLM API needed)")
-@click.option("--poll-seconds", default=60, show_default=True, type=float, help="How often to check remote repo for new commits")
-def watch(repo, output, api_key, base_url, model, mock, poll_seconds):
+def watch(args):
     """Watch the service-console repo and auto-regenerate tests on changes."""
-    watch_repo(
-        service_console_repo=repo,
-        output_dir=output,
-        api_key=api_key,
-        base_url=base_url,
-        model=model,
-        use_mock=mock,
-        poll_seconds=poll_seconds,
+    import asyncio
+
+    from agent.llm_client import build_http_client
+    from agent.watcher import watch_repo_async
+
+    coro = watch_repo_async(
+        service_console_repo=args.repo,
+        output_dir=args.output,
+        api_key=args.api_key,
+        base_url=args.base_url,
+        model=args.model,
+        use_mock=args.mock,
+        poll_seconds=args.poll_seconds,
+        debounce_ms=args.debounce_ms,
+        llm_cache_dir=args.cache_dir,
+        use_llm_cache=not args.no_cache,
+        http_client=None if args.mock else build_http_client(),
     )
+    try:
+        asyncio.run(coro)
+    except KeyboardInterrupt:
+        pass
 
 
-@cli.command()
-@click.option("--repo", "-r", required=True, help="Path or git URL to the service-console repository")
-def scan(repo):
+def scan(args):
     """Scan the service-console repo and display discovered operations (no test generation)."""
     from agent.scanner import RepoScanner
-    if is_git_url(repo):
-        cache_root = os.path.join(os.path.expanduser("~"), ".cache", "test-automation-agent")
-        local_repo = clone_or_update_repo(repo_url=repo, cache_root=cache_root)
-    elif os.path.isdir(repo):
-        local_repo = repo
-    else:
-        click.echo(f"Error: --repo must be a local directory or git URL. Got: {repo}", err=True)
-        sys.exit(1)
+    from agent.scan_cache import ScanCache
+
+    local_repo = _resolve_repo(args.repo)
+
+    scanner = RepoScanner(local_repo, scan_cache=ScanCache())
+    scanner.scan(workers=args.workers)
+    print(scanner.get_scan_summary())
+
+
+def _add_repo_option(parser):
+    parser.add_argument("--repo", "-r", required=True, help="Path or git URL to the service-console repository")
+
+
+def _add_generation_options(parser, base_url_help: str):
+    parser.add_argument("--output", "-o", default="./generated_tests", help="Output directory for generated tests")
+    parser.add_argument("--api-key", "-k", default=None, help="OpenAI API key (or set OPENAI_API_KEY env var)")
+    parser.add_argument("--base-url", "-u", default=None, help=base_url_help)
+    parser.add_argument("--model", "-m", default="gpt-4o", help="LLM model to use")
+    parser.add_argument("--mock", action="store_true", help="Use template-based generation (no LLM API needed)")
+    parser.add_argument("--cache-dir", default=None, help="Directory for cached LLM responses (default: $TESTAGENT_LLM_CACHE_DIR or ~/.cache/test-automation-agent/llm)")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the LLM; don't read or write cached responses")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]) or "main.py",
+        description="Test Automation Agent - Auto-generate Robot Framework tests for service-console operations.",
+    )
+    parser.add_argument("--version", action="version", version=f"%(prog)s, version {VERSION}")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    commands.required = True
+
+    p = commands.add_parser("generate", help=generate.__doc__, description=generate.__doc__)
+    _add_repo_option(p)
+    _add_generation_options(p, "Custom LLM API base URL (for Ollama, LM Studio, etc.)")
+    p.add_argument("--batch-size", default=1, type=int, help="Operations to generate per LLM request, at most 4; 1 sends each on its own (default: %(default)s)")
+    p.add_argument("--concurrency", default=None, type=int, help="Maximum LLM requests in flight (default: $LLM_CONCURRENCY or 8)")
+    p.add_argument("--resume", default=True, action=argparse.BooleanOptionalAction, help="Keep test files an interrupted run already wrote for unchanged operations (default: on)")
+    p.add_argument("--force", action="store_true", help="Regenerate every test file, even if nothing it depends on changed")
+    p.set_defaults(func=generate)
+
+    p = commands.add_parser("watch", help=watch.__doc__, description=watch.__doc__)
+    _add_repo_option(p)
+    _add_generation_options(p, "Custom LLM API base URL")
+    p.add_argument("--poll-seconds", default=60, type=float, help="How often to check remote repo for new commits (default: %(default)s)")
+    p.add_argument("--debounce-ms", default=300, type=float, help="Quiet period that coalesces bursts of changes into one regeneration (default: %(default)s)")
+    p.set_defaults(func=watch)
+
+    p = commands.add_parser("scan", help=scan.__doc__, description=scan.__doc__)
+    _add_repo_option(p)
+    p.add_argument("--workers", "-j", default=None, type=int, help="Processes used to parse operation scripts, 1 = serial (default: a thread pool)")
+    p.set_defaults(func=scan)
+
+    return parser
+
 
-    scanner = RepoScanner(local_repo)
-    scanner.scan()
-    click.echo(scanner.get_scan_summary())
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
 
 
 if __name__ == "__main__":
-    cli()
+    main()